@@ -0,0 +1,341 @@
+# Motor de agregados: cubo de sumas precalculadas sobre las dimensiones del dataset
+import itertools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Dimensiones del cubo (la geografía es jerárquica: DEPARTAMENTO > PROVINCIA > DISTRITO)
+DIMENSIONES = ['PERIODO', 'REG_NAT', 'DEPARTAMENTO', 'PROVINCIA', 'DISTRITO']
+NIVELES_GEO = [
+    (),
+    ('DEPARTAMENTO',),
+    ('DEPARTAMENTO', 'PROVINCIA'),
+    ('DEPARTAMENTO', 'PROVINCIA', 'DISTRITO'),
+]
+# Medidas que se suman en cada celda del cubo
+MEDIDAS = ['QRESIDUOS_DOM', 'QRESIDUOS_NO_DOM', 'QRESIDUOS_MUN', 'POB_TOTAL', 'POB_URBANA', 'POB_RURAL']
+
+
+# Construir el cubo: un DataFrame (cuboide) por cada combinación de
+# {PERIODO o no} x {REG_NAT o no} x {nivel geográfico}. Cada cuboide se calcula
+# a partir del más fino, no de las filas originales.
+def construir_cubo(df):
+    base = df.groupby(DIMENSIONES, sort=True, observed=True)[MEDIDAS].sum().reset_index()
+    cubo = {}
+    for con_periodo, con_region, geo in itertools.product((True, False), (True, False), NIVELES_GEO):
+        dims = tuple(d for d in DIMENSIONES
+                     if (d == 'PERIODO' and con_periodo) or (d == 'REG_NAT' and con_region) or d in geo)
+        if dims == tuple(DIMENSIONES):
+            cubo[dims] = base
+        elif dims:
+            cubo[dims] = base.groupby(list(dims), sort=True, observed=True)[MEDIDAS].sum().reset_index()
+        else:
+            cubo[dims] = base[MEDIDAS].sum().to_frame().T
+    return cubo
+
+
+# Consultar el cubo: agrupa por `por` y aplica `filtros` ({dimensión: valor o lista de valores})
+# usando el cuboide más pequeño que contenga todas las dimensiones pedidas.
+# Ejemplo: consultar_cubo(cubo, ['DEPARTAMENTO'], {'PERIODO': 2019})
+def consultar_cubo(cubo, por, filtros=None, medidas=None):
+    por = list(por)
+    filtros = filtros or {}
+    medidas = list(MEDIDAS if medidas is None else medidas)
+    necesarias = set(por) | set(filtros)
+    desconocidas = necesarias - set(DIMENSIONES)
+    if desconocidas:
+        raise ValueError(f"Dimensiones desconocidas: {sorted(desconocidas)}. Deben ser de {DIMENSIONES}.")
+    candidatos = [dims for dims in cubo if necesarias <= set(dims)]
+    tabla = cubo[min(candidatos, key=lambda dims: len(cubo[dims]))]
+    if filtros:
+        mascara = pd.Series(True, index=tabla.index)
+        for columna, valor in filtros.items():
+            if isinstance(valor, (list, tuple, set)):
+                mascara &= tabla[columna].isin(list(valor))
+            else:
+                mascara &= tabla[columna] == valor
+        tabla = tabla[mascara]
+    if not por:
+        return tabla[medidas].sum().to_frame().T
+    resultado = tabla.groupby(por, sort=True, observed=True)[medidas].sum()
+    return resultado.reset_index()
+
+
+# Índice jerárquico DEPARTAMENTO > PROVINCIA > DISTRITO. Cada nodo guarda la lista
+# ordenada de opciones del nivel siguiente, las posiciones (para iloc) de sus filas
+# y sus nodos hijos:  {'opciones': [...], 'filas': ndarray, 'hijos': {nombre: nodo}}
+NIVELES_UBICACION = ['DEPARTAMENTO', 'PROVINCIA', 'DISTRITO']
+
+def construir_indice_ubicaciones(df):
+    raiz = {'opciones': [], 'filas': np.arange(len(df)), 'hijos': {}}
+    for nivel in range(1, len(NIVELES_UBICACION) + 1):
+        columnas = NIVELES_UBICACION[:nivel]
+        grupos = df.groupby(columnas, sort=True, observed=True).indices
+        for clave, filas in grupos.items():
+            ruta = clave if isinstance(clave, tuple) else (clave,)
+            padre = raiz
+            for nombre in ruta[:-1]:
+                padre = padre['hijos'][nombre]
+            padre['opciones'].append(ruta[-1])
+            padre['hijos'][ruta[-1]] = {'opciones': [], 'filas': filas, 'hijos': {}}
+    return raiz
+
+# Devuelve el nodo del índice para una ruta (departamento, provincia, distrito) parcial o completa
+def nodo_ubicacion(indice, *ruta):
+    nodo = indice
+    for nombre in ruta:
+        nodo = nodo['hijos'][nombre]
+    return nodo
+
+
+# Mapa nacional: los distritos se agrupan en celdas de una grilla de latitud/longitud
+# cuyo tamaño depende del nivel de zoom, para que el navegador reciba cientos de puntos
+# y no los ~1.9k distritos. Cada nivel: tamaño de celda en grados y zoom del mapa.
+NIVELES_MAPA = {
+    'Nacional': {'celda': 1.0, 'zoom': 4},
+    'Regional': {'celda': 0.5, 'zoom': 5},
+    'Provincial': {'celda': 0.25, 'zoom': 6},
+}
+# Medidas del mapa: nombre de la columna en las celdas y etiqueta para el usuario
+MEDIDAS_MAPA = {
+    'QRESIDUOS_MUN': 'Residuos municipales (Ton/Año)',
+    'PER_CAPITA': 'Residuos per cápita (kg/hab/año)',
+}
+
+# Devuelve {nivel: {periodo: celdas}}; las celdas traen el centroide de sus distritos
+# (latitud, longitud), los totales de residuos y población, el número de distritos y
+# los residuos per cápita (cociente de los totales de la celda). `distritos_geo` debe
+# tener latitud/longitud; las filas sin coordenadas se omiten.
+def construir_celdas_mapa(distritos_geo):
+    con_coordenadas = distritos_geo[distritos_geo['latitud'].notna() & distritos_geo['longitud'].notna()]
+    base = pd.DataFrame({
+        'PERIODO': con_coordenadas['PERIODO'].to_numpy(),
+        'latitud': con_coordenadas['latitud'].to_numpy(),
+        'longitud': con_coordenadas['longitud'].to_numpy(),
+        'QRESIDUOS_MUN': con_coordenadas['QRESIDUOS_MUN'].to_numpy(),
+        'POB_TOTAL': con_coordenadas['POB_TOTAL'].to_numpy(),
+    })
+    celdas = {}
+    for nivel, config in NIVELES_MAPA.items():
+        tabla = base.assign(
+            fila=np.floor(base['latitud'].to_numpy() / config['celda']).astype(np.int32),
+            columna=np.floor(base['longitud'].to_numpy() / config['celda']).astype(np.int32),
+        )
+        grupos = tabla.groupby(['PERIODO', 'fila', 'columna'], sort=True).agg(
+            latitud=('latitud', 'mean'),
+            longitud=('longitud', 'mean'),
+            QRESIDUOS_MUN=('QRESIDUOS_MUN', 'sum'),
+            POB_TOTAL=('POB_TOTAL', 'sum'),
+            DISTRITOS=('QRESIDUOS_MUN', 'size'),
+        ).reset_index()
+        poblacion = grupos['POB_TOTAL'].to_numpy(dtype=float)
+        grupos['PER_CAPITA'] = np.divide(grupos['QRESIDUOS_MUN'].to_numpy() * 1000, poblacion,
+                                         out=np.full(len(grupos), np.nan), where=poblacion > 0)
+        celdas[nivel] = {int(periodo): tabla_periodo.drop(columns='PERIODO').reset_index(drop=True)
+                         for periodo, tabla_periodo in grupos.groupby('PERIODO', sort=True)}
+    return celdas
+
+
+# Rankings: indicadores derivados por unidad geográfica y PERIODO, en matrices densas
+# (unidades x periodos) calculadas de una sola vez a partir del cubo
+NIVELES_RANKING = {
+    'Departamento': ('DEPARTAMENTO',),
+    'Provincia': ('DEPARTAMENTO', 'PROVINCIA'),
+    'Distrito': ('DEPARTAMENTO', 'PROVINCIA', 'DISTRITO'),
+}
+INDICADORES = {
+    'PER_CAPITA': 'Residuos per cápita (kg/hab/año)',
+    'CRECIMIENTO': 'Crecimiento interanual (%)',
+    'PARTE_DOM': 'Parte domiciliaria (%)',
+    'QRESIDUOS_MUN': 'Residuos municipales (Ton/Año)',
+}
+# Máximo de consultas de ranking que se recuerdan
+MAX_RANKINGS = 256
+
+def _dividir(numerador, denominador):
+    return np.divide(numerador, denominador, out=np.full(numerador.shape, np.nan),
+                     where=np.isfinite(denominador) & (denominador > 0))
+
+# Devuelve {'periodos': [...], 'niveles': {nivel: {'unidades': DataFrame, 'matrices': {indicador: ndarray}}},
+# 'consultas': OrderedDict, 'lock': Lock}. Las celdas sin dato (unidad ausente ese año,
+# población 0 o año anterior sin residuos para el crecimiento) quedan en NaN.
+def construir_indicadores(cubo):
+    periodos = consultar_cubo(cubo, ['PERIODO'], medidas=[])['PERIODO'].to_numpy()
+    niveles = {}
+    for nivel, geo in NIVELES_RANKING.items():
+        tabla = consultar_cubo(cubo, ('PERIODO',) + geo,
+                               medidas=['QRESIDUOS_DOM', 'QRESIDUOS_NO_DOM', 'QRESIDUOS_MUN', 'POB_TOTAL'])
+        unidad_codigos, unidades = pd.MultiIndex.from_frame(tabla[list(geo)]).factorize()
+        periodo_codigos = np.searchsorted(periodos, tabla['PERIODO'].to_numpy())
+        forma = (len(unidades), len(periodos))
+        matrices = {}
+        for medida in ['QRESIDUOS_DOM', 'QRESIDUOS_NO_DOM', 'QRESIDUOS_MUN', 'POB_TOTAL']:
+            matriz = np.full(forma, np.nan)
+            matriz[unidad_codigos, periodo_codigos] = tabla[medida].to_numpy(dtype=float)
+            matrices[medida] = matriz
+        municipales = matrices['QRESIDUOS_MUN']
+        crecimiento = np.full(forma, np.nan)
+        crecimiento[:, 1:] = (_dividir(municipales[:, 1:], municipales[:, :-1]) - 1) * 100
+        niveles[nivel] = {
+            'unidades': unidades.set_names(list(geo)).to_frame(index=False),
+            'matrices': {
+                'PER_CAPITA': _dividir(municipales * 1000, matrices['POB_TOTAL']),
+                'CRECIMIENTO': crecimiento,
+                'PARTE_DOM': _dividir(matrices['QRESIDUOS_DOM'] * 100,
+                                      matrices['QRESIDUOS_DOM'] + matrices['QRESIDUOS_NO_DOM']),
+                'QRESIDUOS_MUN': municipales,
+            },
+        }
+    return {'periodos': [int(p) for p in periodos], 'niveles': niveles,
+            'consultas': OrderedDict(), 'lock': threading.Lock()}
+
+
+# Las `k` unidades con mayor (o menor) valor del indicador en el PERIODO, ya ordenadas.
+# Se seleccionan con np.argpartition y solo se ordenan esas k; el resultado se memoriza.
+def ranking(indicadores, nivel, indicador, periodo, k=10, mayores=True):
+    clave = (nivel, indicador, int(periodo), int(k), mayores)
+    with indicadores['lock']:
+        if clave in indicadores['consultas']:
+            indicadores['consultas'].move_to_end(clave)
+            return indicadores['consultas'][clave]
+    datos_nivel = indicadores['niveles'][nivel]
+    columna = datos_nivel['matrices'][indicador][:, indicadores['periodos'].index(int(periodo))]
+    validas = np.flatnonzero(~np.isnan(columna))
+    valores = columna[validas] if mayores else -columna[validas]
+    k = min(k, len(validas))
+    if k < len(validas):
+        elegidas = np.argpartition(-valores, k - 1)[:k]
+    else:
+        elegidas = np.arange(len(validas))
+    elegidas = elegidas[np.argsort(-valores[elegidas], kind='stable')]
+    filas = validas[elegidas]
+    resultado = datos_nivel['unidades'].iloc[filas].reset_index(drop=True)
+    resultado.insert(0, 'PUESTO', np.arange(1, len(filas) + 1))
+    resultado[indicador] = columna[filas]
+    with indicadores['lock']:
+        indicadores['consultas'][clave] = resultado
+        while len(indicadores['consultas']) > MAX_RANKINGS:
+            indicadores['consultas'].popitem(last=False)
+    return resultado
+
+
+# Comparación de varias unidades: las filas de todas las rutas (departamento, provincia
+# o departamento, provincia, distrito) salen del índice de ubicaciones y se toman con un
+# solo iloc, y se suman por unidad y PERIODO con un solo groupby. El costo depende de las
+# filas elegidas, no del tamaño de la tabla.
+SEPARADOR_UBICACION = ' / '
+MEDIDAS_COMPARACION = {
+    'QRESIDUOS_MUN': 'Residuos municipales (Ton/Año)',
+    'QRESIDUOS_DOM': 'Residuos domiciliarios (Ton/Año)',
+    'QRESIDUOS_NO_DOM': 'Residuos no domiciliarios (Ton/Año)',
+    'PER_CAPITA': 'Residuos per cápita (kg/hab/año)',
+}
+
+# Todas las rutas del índice con `profundidad` niveles (2 = provincias, 3 = distritos)
+def rutas_ubicacion(indice, profundidad):
+    rutas = [()]
+    for _ in range(profundidad):
+        rutas = [ruta + (opcion,) for ruta in rutas for opcion in nodo_ubicacion(indice, *ruta)['opciones']]
+    return rutas
+
+def etiqueta_ubicacion(ruta):
+    return SEPARADOR_UBICACION.join(map(str, ruta))
+
+# Devuelve una fila por (UNIDAD, PERIODO) con los residuos, la población y los residuos
+# per cápita; UNIDAD es categórica y conserva el orden de `rutas`
+def series_comparacion(df, indice, rutas):
+    rutas = list(dict.fromkeys(tuple(ruta) for ruta in rutas))
+    filas = [nodo_ubicacion(indice, *ruta)['filas'] for ruta in rutas]
+    posiciones = np.concatenate(filas) if filas else np.array([], dtype=np.intp)
+    unidad = pd.Categorical.from_codes(np.repeat(np.arange(len(rutas)), [len(f) for f in filas]),
+                                       categories=[etiqueta_ubicacion(ruta) for ruta in rutas])
+    medidas = ['QRESIDUOS_DOM', 'QRESIDUOS_NO_DOM', 'QRESIDUOS_MUN', 'POB_TOTAL']
+    tabla = df.iloc[posiciones, [df.columns.get_loc(c) for c in ['PERIODO'] + medidas]].assign(UNIDAD=unidad)
+    series = tabla.groupby(['UNIDAD', 'PERIODO'], sort=True, observed=True)[medidas].sum().reset_index()
+    poblacion = series['POB_TOTAL'].to_numpy(dtype=float)
+    series['PER_CAPITA'] = np.divide(series['QRESIDUOS_MUN'].to_numpy() * 1000, poblacion,
+                                     out=np.full(len(series), np.nan), where=poblacion > 0)
+    return series
+
+
+# Proyecciones: una recta de tendencia (mínimos cuadrados sobre PERIODO) por unidad y
+# medida, ajustadas todas a la vez sobre las matrices unidades x periodos de los
+# indicadores. Las celdas sin dato (NaN) no cuentan en el ajuste de su unidad.
+MEDIDAS_PROYECCION = {
+    'QRESIDUOS_MUN': 'Residuos municipales (Ton/Año)',
+    'PER_CAPITA': 'Residuos per cápita (kg/hab/año)',
+}
+# Años que se proyectan después del último PERIODO
+HORIZONTE_PROYECCION = 3
+# Mínimo de periodos con dato para ajustar una recta
+MIN_PERIODOS_AJUSTE = 3
+
+# Ajuste por lotes de y = intercepto + pendiente * t para cada fila de `matriz`: las
+# sumas de las ecuaciones normales (2x2 por fila) se calculan con operaciones sobre
+# toda la matriz y el sistema se resuelve en forma cerrada. Devuelve intercepto,
+# pendiente, desvío de los residuos y periodos usados por fila; NaN si hay menos de
+# MIN_PERIODOS_AJUSTE periodos con dato.
+def ajustar_tendencias(matriz, t):
+    pesos = ~np.isnan(matriz)
+    y = np.where(pesos, matriz, 0.0)
+    n = pesos.sum(axis=1)
+    suma_t = pesos @ t
+    suma_tt = pesos @ (t * t)
+    suma_y = y.sum(axis=1)
+    suma_ty = y @ t
+    determinante = n * suma_tt - suma_t ** 2
+    validas = (n >= MIN_PERIODOS_AJUSTE) & (determinante > 0)
+    pendiente = _dividir(n * suma_ty - suma_t * suma_y, np.where(validas, determinante, np.nan))
+    intercepto = _dividir(suma_y - pendiente * suma_t, np.where(validas, n, np.nan))
+    ajuste = intercepto[:, None] + pendiente[:, None] * t[None, :]
+    cuadrados = np.where(pesos, (matriz - ajuste) ** 2, 0.0).sum(axis=1)
+    desvio = np.sqrt(_dividir(cuadrados, np.where(validas, n - 2, np.nan)))
+    return intercepto, pendiente, desvio, n
+
+# Devuelve {'periodos': [...], 'futuros': [...], 'niveles': {nivel: {'posiciones': {ruta: fila},
+# 'ajustes': {medida: {'intercepto', 'pendiente', 'desvio', 'periodos_ajuste'}}}}}
+def construir_proyecciones(indicadores, horizonte=HORIZONTE_PROYECCION):
+    periodos = np.array(indicadores['periodos'])
+    t = (periodos - periodos[0]).astype(float)
+    niveles = {}
+    for nivel, datos_nivel in indicadores['niveles'].items():
+        unidades = datos_nivel['unidades']
+        ajustes = {}
+        for medida in MEDIDAS_PROYECCION:
+            intercepto, pendiente, desvio, n = ajustar_tendencias(datos_nivel['matrices'][medida], t)
+            ajustes[medida] = {'intercepto': intercepto, 'pendiente': pendiente, 'desvio': desvio, 'periodos_ajuste': n}
+        niveles[nivel] = {
+            'posiciones': {tuple(ruta): i for i, ruta in enumerate(unidades.itertuples(index=False, name=None))},
+            'matrices': {medida: datos_nivel['matrices'][medida] for medida in MEDIDAS_PROYECCION},
+            'ajustes': ajustes,
+        }
+    futuros = list(range(int(periodos[-1]) + 1, int(periodos[-1]) + 1 + horizonte))
+    return {'periodos': [int(p) for p in periodos], 'futuros': futuros, 'niveles': niveles}
+
+# Serie observada y proyectada de una unidad (ruta de `nivel`): una fila por PERIODO con
+# OBSERVADO (NaN en los futuros), TENDENCIA y una banda de ±2 desvíos de los residuos.
+# Las medidas no pueden ser negativas, así que la tendencia y la banda se cortan en 0.
+# Solo indexa arreglos ya calculados; devuelve None si la unidad no tiene ajuste.
+def proyeccion(proyecciones, nivel, ruta, medida):
+    datos_nivel = proyecciones['niveles'][nivel]
+    fila = datos_nivel['posiciones'].get(tuple(ruta))
+    if fila is None:
+        return None
+    ajuste = datos_nivel['ajustes'][medida]
+    if np.isnan(ajuste['pendiente'][fila]):
+        return None
+    periodos = np.array(proyecciones['periodos'] + proyecciones['futuros'])
+    tendencia = ajuste['intercepto'][fila] + ajuste['pendiente'][fila] * (periodos - proyecciones['periodos'][0])
+    observado = np.full(len(periodos), np.nan)
+    observado[:len(proyecciones['periodos'])] = datos_nivel['matrices'][medida][fila]
+    margen = 2 * ajuste['desvio'][fila]
+    return pd.DataFrame({
+        'PERIODO': periodos,
+        'OBSERVADO': observado,
+        'TENDENCIA': np.maximum(tendencia, 0),
+        'INFERIOR': np.maximum(tendencia - margen, 0),
+        'SUPERIOR': np.maximum(tendencia + margen, 0),
+        'PROYECTADO': periodos > proyecciones['periodos'][-1],
+    })
@@ -0,0 +1,211 @@
+# Almacén de residuos particionado por PERIODO: cada año es un snapshot columnar propio
+# (mismo formato que datos.py) y un manifiesto guarda la huella de contenido de cada año.
+# Agregar o reemplazar un año solo escribe esa partición, y la carga reutiliza en memoria
+# las particiones cuya huella no cambió.
+import argparse
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import pandas as pd
+
+import datos
+
+ALMACEN_DIR = os.path.join(datos.BASE_DIR, '.particiones', 'residuos')
+MANIFIESTO = 'manifiesto.json'
+BLOQUEO = '.bloqueo'
+
+logger = logging.getLogger(__name__)
+
+# Particiones ya leídas en este proceso: {periodo: (huella, DataFrame)}
+_memoria = {}
+_lock = threading.Lock()
+# Escrituras al almacén: un solo escritor a la vez entre hilos (este lock) y entre
+# procesos (flock sobre almacen_dir/.bloqueo)
+_lock_escritura = threading.Lock()
+
+
+def _nombre_particion(periodo):
+    return f'PERIODO={int(periodo)}'
+
+# Huella del contenido de una partición (independiente de cuándo se escribió y de la
+# posición de sus filas en el CSV, así un cambio en otro año no la altera)
+def huella_particion(df_periodo):
+    valores = pd.util.hash_pandas_object(df_periodo, index=False).to_numpy()
+    return hashlib.sha1(valores.tobytes()).hexdigest()
+
+
+def leer_manifiesto(almacen_dir=None):
+    ruta = os.path.join(almacen_dir or ALMACEN_DIR, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return {'origen': None, 'particiones': {}}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+def _escribir_manifiesto(manifiesto, almacen_dir=None):
+    almacen_dir = almacen_dir or ALMACEN_DIR
+    os.makedirs(almacen_dir, exist_ok=True)
+    datos._escribir_json(os.path.join(almacen_dir, MANIFIESTO), manifiesto)
+
+@contextlib.contextmanager
+def _bloqueo(almacen_dir):
+    os.makedirs(almacen_dir, exist_ok=True)
+    with _lock_escritura, open(os.path.join(almacen_dir, BLOQUEO), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+# Versión del almacén: cambia cuando cambia cualquier partición. Sin particiones (el
+# almacén no se pudo escribir y cargar() lee el CSV) es la versión del CSV.
+def version(manifiesto=None, almacen_dir=None):
+    manifiesto = manifiesto or leer_manifiesto(almacen_dir)
+    if not manifiesto['particiones']:
+        return datos.version_datos(datos.RESIDUOS_CSV)
+    partes = sorted((p['periodo'], p['huella']) for p in manifiesto['particiones'].values())
+    return hashlib.sha1(repr(partes).encode()).hexdigest()[:16]
+
+
+# Agrega o reemplaza las particiones de los PERIODO presentes en `df`. Solo se escriben
+# las que cambiaron de contenido; devuelve la lista de periodos escritos.
+def agregar_particiones(df, almacen_dir=None, origen=None):
+    almacen_dir = almacen_dir or ALMACEN_DIR
+    with _bloqueo(almacen_dir):
+        return _agregar_particiones(df, almacen_dir, origen)
+
+# Se llama con el bloqueo tomado: el manifiesto se relee aquí, así lo que otro escritor
+# publicó mientras se esperaba el bloqueo no se vuelve a escribir. Una partición que no
+# se pudo escribir se registra y queda fuera del manifiesto (y el origen no se marca
+# como sincronizado, para reintentar la próxima vez).
+def _agregar_particiones(df, almacen_dir, origen=None):
+    manifiesto = leer_manifiesto(almacen_dir)
+    escritos = []
+    fallidos = []
+    for periodo, df_periodo in df.groupby('PERIODO', sort=True):
+        nombre = _nombre_particion(periodo)
+        huella = huella_particion(df_periodo)
+        actual = manifiesto['particiones'].get(nombre)
+        if actual is not None and actual['huella'] == huella and datos.existe_snapshot(nombre, almacen_dir):
+            continue
+        try:
+            datos.guardar_snapshot(df_periodo, nombre, None, almacen_dir, huella=huella)
+        except OSError as e:
+            logger.warning("No se pudo escribir la partición %s: %r", nombre, e)
+            fallidos.append(int(periodo))
+            continue
+        manifiesto['particiones'][nombre] = {'periodo': int(periodo), 'huella': huella, 'filas': len(df_periodo)}
+        escritos.append(int(periodo))
+    if origen is not None and not fallidos:
+        manifiesto['origen'] = origen
+    if escritos or (origen is not None and not fallidos):
+        _escribir_manifiesto(manifiesto, almacen_dir)
+    return escritos
+
+# Ingesta de un CSV con el formato de residuos_municipales.csv (uno o varios años)
+def ingestar_csv(file_path, almacen_dir=None):
+    return agregar_particiones(datos.leer_csv_residuos(file_path), almacen_dir)
+
+def eliminar_particion(periodo, almacen_dir=None):
+    almacen_dir = almacen_dir or ALMACEN_DIR
+    with _bloqueo(almacen_dir):
+        manifiesto = leer_manifiesto(almacen_dir)
+        nombre = _nombre_particion(periodo)
+        if manifiesto['particiones'].pop(nombre, None) is None:
+            raise KeyError(f"No existe la partición {nombre}")
+        _escribir_manifiesto(manifiesto, almacen_dir)
+        datos.eliminar_snapshot(nombre, almacen_dir)
+
+
+# Mantiene el almacén al día con el CSV plano del proyecto: si el CSV cambió desde la
+# última sincronización (mtime/tamaño), se parsea y se reescriben solo los años cuyo
+# contenido cambió. Los años agregados por ingesta que no están en el CSV se conservan.
+# Varias sesiones (o procesos) pueden llamarla a la vez: una sincroniza y las demás
+# esperan el bloqueo y encuentran el manifiesto ya al día. Si el almacén no se puede
+# escribir, se registra el error y se devuelve el manifiesto que haya.
+def sincronizar_desde_csv(file_path=datos.RESIDUOS_CSV, almacen_dir=None):
+    almacen_dir = almacen_dir or ALMACEN_DIR
+    huella = datos.huella_archivo(file_path, con_hash=False)
+    origen = {'archivo': os.path.basename(file_path), **huella}
+
+    def al_dia(manifiesto):
+        return manifiesto.get('origen') == origen and manifiesto['particiones']
+
+    manifiesto = leer_manifiesto(almacen_dir)
+    if al_dia(manifiesto):
+        return manifiesto
+    try:
+        with _bloqueo(almacen_dir):
+            if not al_dia(leer_manifiesto(almacen_dir)):
+                _agregar_particiones(datos.leer_csv_residuos(file_path), almacen_dir, origen=origen)
+    except OSError as e:
+        logger.warning("No se pudo sincronizar el almacén %s: %r", almacen_dir, e)
+    return leer_manifiesto(almacen_dir)
+
+
+# Carga las particiones pedidas (todas si `periodos` es None), en orden de PERIODO.
+# Las particiones con la misma huella que la última vez se toman de memoria.
+# Si el almacén está vacío (carpeta de solo lectura, disco lleno) se lee
+# residuos_municipales.csv con datos.cargar_residuos, como cargar_con_snapshot.
+def cargar(periodos=None, almacen_dir=None, manifiesto=None):
+    almacen_dir = almacen_dir or ALMACEN_DIR
+    manifiesto = manifiesto or leer_manifiesto(almacen_dir)
+    if not manifiesto['particiones']:
+        logger.warning("El almacén %s no tiene particiones, se lee %s", almacen_dir, datos.RESIDUOS_CSV)
+        df = datos.cargar_residuos()
+        if periodos is not None:
+            df = df[df['PERIODO'].isin([int(p) for p in periodos])].reset_index(drop=True)
+        if df.empty:
+            raise KeyError(f"No hay filas para los periodos {periodos}")
+        return df
+    particiones = sorted(manifiesto['particiones'].items(), key=lambda item: item[1]['periodo'])
+    if periodos is not None:
+        pedidos = {int(p) for p in periodos}
+        particiones = [(n, p) for n, p in particiones if p['periodo'] in pedidos]
+    partes = []
+    for nombre, info in particiones:
+        clave = (almacen_dir, info['periodo'])
+        with _lock:
+            en_memoria = _memoria.get(clave)
+        if en_memoria is None or en_memoria[0] != info['huella']:
+            # Las particiones escritas con el esquema anterior se compactan al leerlas
+            en_memoria = (info['huella'], datos.compactar_residuos(datos.leer_snapshot(nombre, snapshot_dir=almacen_dir)))
+            with _lock:
+                _memoria[clave] = en_memoria
+        partes.append(en_memoria[1])
+    if not partes:
+        raise KeyError(f"No hay particiones para los periodos {periodos}")
+    return _concatenar(partes) if len(partes) > 1 else partes[0].copy()
+
+# Cada partición tiene sus propias categorías; se llevan todas a la unión (ordenada) para
+# que pd.concat conserve el tipo categórico en vez de volver a textos
+def _concatenar(partes):
+    for col in datos.COLUMNAS_CATEGORICAS:
+        categorias = sorted(set().union(*(p[col].cat.categories for p in partes)))
+        partes = [p.assign(**{col: p[col].cat.set_categories(categorias)}) for p in partes]
+    return pd.concat(partes, ignore_index=True)
+
+
+# Uso:  python almacen.py listar | agregar nuevo_anio.csv | eliminar 2022 | sincronizar
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Almacén de residuos particionado por PERIODO")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('listar', help="Lista las particiones")
+    sub.add_parser('sincronizar', help="Sincroniza con residuos_municipales.csv")
+    agregar = sub.add_parser('agregar', help="Agrega o reemplaza los años de un CSV")
+    agregar.add_argument('csv')
+    eliminar = sub.add_parser('eliminar', help="Elimina la partición de un año")
+    eliminar.add_argument('periodo', type=int)
+    args = parser.parse_args()
+    if args.comando == 'sincronizar':
+        sincronizar_desde_csv()
+    elif args.comando == 'agregar':
+        print("Particiones escritas:", ingestar_csv(args.csv) or "ninguna (sin cambios)")
+    elif args.comando == 'eliminar':
+        eliminar_particion(args.periodo)
+    for nombre, info in sorted(leer_manifiesto()['particiones'].items()):
+        print(f"{nombre:<14} {info['filas']:>8} filas  {info['huella'][:12]}")
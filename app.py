@@ -1,9 +1,15 @@
 # Importar bibliotecas necesarias
-import pandas as pd
+import functools
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 from streamlit_option_menu import option_menu
+import datos
+import almacen
+import agregados
+import graficos
+import instrumentacion
+import precarga
+import recursos
+import tablas
 # Configuración de la página de Streamlit
 st.set_page_config(page_title="Residuos Municipales", page_icon="🚮", initial_sidebar_state="expanded", layout='wide')
 # Estilos en formato HTML para el texto
@@ -19,245 +25,359 @@ text_style = """
         }
     </style>
 """
+# Instrumentación opt-in: con ?debug=1 en la URL (o RESIDUOS_DEBUG=1) se miden los tramos
+# de cada rerun y se muestran en un panel de la barra lateral
+modo_debug = st.query_params.get('debug') == '1'
+if modo_debug and 'id_sesion' not in st.session_state:
+    st.session_state['id_sesion'] = instrumentacion.nueva_etiqueta()
+instrumentacion.iniciar_rerun(modo_debug, st.session_state.get('id_sesion'))
 st.markdown(text_style, unsafe_allow_html=True)
 # Título principal de la pagina
 st.markdown("<h2 class='title_text'>Residuos Municipales (2014-2021)<h3>" , unsafe_allow_html=True)
 
 
-# Cargar el archivo CSV en un DataFrame
-@st.cache_data
-def load_data():
-    file_path = 'residuos_municipales.csv'
-    df = pd.read_csv(file_path, encoding="latin1", delimiter=";", index_col=0)
-    df["PERIODO"] = df["PERIODO"].astype(int)
-    return df
+# Cargar los residuos desde el almacén particionado por PERIODO (un snapshot por año;
+# los años que no cambiaron se reutilizan de memoria). `version` es la versión de los
+# datos fuente: si cambian, la caché se invalida.
+# Los datos se cargan una sola vez por versión y todas las sesiones comparten la misma
+# copia de solo lectura (st.cache_data en cambio deserializa una copia en cada llamada).
+# Las cargas por versión guardan a lo sumo dos versiones (la vigente y la anterior, que
+# pueden estar usando sesiones a medio rerun); las más viejas se liberan.
+@st.cache_resource(max_entries=2)
+def _load_data_compartido(version):
+    with instrumentacion.tramo('lectura_particiones', archivo='residuos_municipales.csv'):
+        df = almacen.cargar()
+    return datos.solo_lectura(df)
 
-@st.cache_data
-def load_tb_ubigeos():
-    ubigeos_ll = 'TB_UBIGEOS.csv'
-    dful = pd.read_csv(ubigeos_ll, encoding="latin1", delimiter=";", index_col=0)
-    return dful
+@st.cache_resource(max_entries=2)
+def _load_tb_ubigeos_compartido(version):
+    with instrumentacion.tramo('lectura_csv_o_snapshot', archivo='TB_UBIGEOS.csv'):
+        dful = datos.cargar_ubigeos(mmap=True)
+    return datos.solo_lectura(dful)
 
-df = load_data()
-dful = load_tb_ubigeos()
+# Cada llamada recibe una vista superficial: agregar, quitar o renombrar columnas solo
+# afecta a esa vista, y la copia compartida no se puede modificar (ver datos.solo_lectura)
+def load_data(version=None):
+    return _load_data_compartido(version).copy(deep=False)
+
+def load_tb_ubigeos(version=None):
+    return _load_tb_ubigeos_compartido(version).copy(deep=False)
+
+# Cubo de agregados, construido una sola vez por versión de los datos
+@st.cache_resource(max_entries=2)
+def load_cubo(version, _df):
+    return agregados.construir_cubo(_df)
+
+# Índice DEPARTAMENTO > PROVINCIA > DISTRITO para los selectbox en cascada del gráfico 4
+@st.cache_resource(max_entries=2)
+def load_indice_ubicaciones(version, _df):
+    return agregados.construir_indice_ubicaciones(_df)
+
+# Tabla de residuos con las coordenadas, altitud, superficie y macroregión ya unidas
+@st.cache_resource(max_entries=2)
+def load_distritos_geo(version, _df, _dful):
+    distritos_geo, _faltantes = datos.enriquecer_con_ubigeos(_df, _dful)
+    return distritos_geo
+
+# Indicadores de los rankings (per cápita, crecimiento, parte domiciliaria), una vez por versión
+@st.cache_resource(max_entries=2)
+def load_indicadores(version, _cubo):
+    return agregados.construir_indicadores(_cubo)
+
+# Rectas de tendencia de todas las unidades, ajustadas por lotes una vez por versión
+@st.cache_resource(max_entries=2)
+def load_proyecciones(version, _indicadores):
+    return agregados.construir_proyecciones(_indicadores)
+
+# Celdas del mapa nacional por nivel de zoom y PERIODO, calculadas una vez por versión
+@st.cache_resource(max_entries=2)
+def load_celdas_mapa(version, _distritos_geo):
+    return agregados.construir_celdas_mapa(_distritos_geo)
+
+# Caché de figuras compartida por todas las sesiones (LRU por número de figuras y bytes)
+@st.cache_resource
+def load_cache_figuras():
+    return graficos.CacheFiguras(max_entradas=128, max_bytes=32 * 1024 * 1024)
+
+# Precarga en segundo plano de las figuras de las pestañas de 'Inicio' (2 hilos como máximo)
+@st.cache_resource
+def load_precargador():
+    return precarga.Precargador(load_cache_figuras(), max_trabajos=2)
+
+# Mostrar una imagen del proyecto desde su variante WebP (al ancho mostrado, con la huella
+# del contenido en el nombre). Con server.enableStaticServing se sirve como archivo
+# estático, con la misma URL para todas las sesiones mientras la imagen no cambie, así
+# que el navegador (o un proxy) puede guardarla en caché sin límite; si no (o si la
+# variante no se pudo generar y `archivo` es la imagen de origen), se envía con st.image.
+def mostrar_imagen(archivo, caption=None, contenedor=st):
+    with instrumentacion.tramo('st.image', archivo=archivo):
+        if st.get_option('server.enableStaticServing') and recursos.es_variante(archivo):
+            pie = f"<p style='text-align:center;color:gray;font-size:14px'>{caption}</p>" if caption else ''
+            contenedor.markdown(f"<img src='{recursos.url(archivo)}' style='width:100%'>{pie}", unsafe_allow_html=True)
+        else:
+            contenedor.image(recursos.ruta(archivo), caption=caption, width='stretch')
+
+# Mostrar una figura desde la caché de figuras (construyéndola si hace falta),
+# midiendo por separado la construcción y el envío con st.plotly_chart. En un acierto se
+# usa la misma figura ya construida, sin reconstruirla desde el JSON.
+def mostrar_figura(clave, construir, **kwargs):
+    precargador.usar(clave)
+    with instrumentacion.tramo('figura', grafico=clave[0]) as t:
+        fig, figura_json = cache_figuras.obtener_serializada(clave, construir)
+        t.anotar(json_bytes=len(figura_json))
+    with instrumentacion.tramo('st.plotly_chart', grafico=clave[0]):
+        st.plotly_chart(fig, **kwargs)
+
+# El almacén se sincroniza con residuos_municipales.csv solo si el CSV cambió (un stat)
+manifiesto = almacen.sincronizar_desde_csv()
+version = datos.version_datos(datos.UBIGEOS_CSV) + almacen.version(manifiesto)
+with instrumentacion.tramo('load_data') as t:
+    df = load_data(version)
+    t.anotar(filas=len(df))
+with instrumentacion.tramo('load_tb_ubigeos') as t:
+    dful = load_tb_ubigeos(version)
+    t.anotar(filas=len(dful))
 dfud = df
+with instrumentacion.tramo('load_cubo'):
+    cubo = load_cubo(version, df)
+cache_figuras = load_cache_figuras()
+precargador = load_precargador()
 
-@st.cache_data
-def process_data(df):
-    # Group by DEPARTAMENTO and PERIODO and sum QRESIDUOS_MUN
-    df_grouped = df.groupby(['PERIODO', 'DEPARTAMENTO'])['QRESIDUOS_MUN'].sum().reset_index()
-    return df_grouped
+# Figura del primer gráfico (agregada desde el cubo)
+def construir_chart1():
+    with instrumentacion.tramo('agregacion') as t:
+        sum_by_periodo = agregados.consultar_cubo(cubo, ["PERIODO"], medidas=["QRESIDUOS_MUN"])
+        t.anotar(filas=len(sum_by_periodo))
+    return graficos.figura_chart1(sum_by_periodo)
 
 # Función para generar el primer gráfico
 def do_chart1():
-    global df
-    sum_by_periodo = df.groupby("PERIODO")["QRESIDUOS_MUN"].sum().reset_index()
-    # Crear un gráfico de pastel (donut chart) utilizando plotly
-    pull_values = [0.1] + [0] * (len(sum_by_periodo) - 1)
-    fig = go.Figure()
-    # Resaltar el primer periodo (2014)
-    fig.add_trace(go.Pie(
-        labels=sum_by_periodo["PERIODO"],
-        values=sum_by_periodo["QRESIDUOS_MUN"],
-        texttemplate="%{label}<br>%{percent:.2%}",
-        hole=0.4,
-        showlegend=True,
-        hovertemplate="<b>Año</b>: %{label}<br>"
-                    "<b>Total</b>: %{value:.2f} Ton/Año<br>"
-                    "<b>Porcentaje</b>: %{percent:.2%}<br>"
-                    "<extra></extra>",
-        textinfo='percent+value',
-        # pull=[0.1] * len(sum_by_periodo),
-        pull=pull_values,
-        marker=dict(colors=px.colors.qualitative.Set3),
-        sort=False  # Desactivar el ordenamiento automático
-    ))
-    # Use `hole` to create a donut-like pie chart
-    fig.update_traces(hole=.4, hoverinfo="label+percent")
-    # Anotación central
-    fig.add_annotation(
-        text="RR.SS",
-        x=0.5,
-        y=0.5,
-        showarrow=False,
-        font=dict(size=20)
-    )
-
-    fig.update_layout(
-        title="Residuos municipales Ton/Año | 2014 - 2021",
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        font=dict(family="Arial", size=12, color="black"),
-    )
-
-    st.plotly_chart(fig, use_container_width=True)
+    mostrar_figura(('chart1', (), version), construir_chart1)
 
     st.markdown("*Gráfica 1: El gráfico representa la proporción expresada en porcentajes de la cantidad de residuos sólidos municipales por año*")
     st.info('En el gráfico se presenta una comparación detallada de la cantidad de residuos sólidos municipales registrados entre 2014 y 2021, junto con su proporción respecto al total acumulado en dicho período. La visualización destaca una tendencia ascendente en el porcentaje de residuos municipales, evidenciando un incremento constante en cada intervalo analizado. ', icon="😀")
+# Figura del segundo gráfico (agregada desde el cubo)
+def construir_chart2():
+    with instrumentacion.tramo('agregacion') as t:
+        sum_residuos_urbanos = agregados.consultar_cubo(cubo, ["DEPARTAMENTO"], medidas=["QRESIDUOS_MUN"])
+        t.anotar(filas=len(sum_residuos_urbanos))
+    return graficos.figura_chart2(sum_residuos_urbanos)
+
 # Función para generar el segundo gráfico
 def do_chart2():
-    sum_residuos_urbanos = df.groupby("DEPARTAMENTO")["QRESIDUOS_MUN"].sum().reset_index()
-    sum_residuos_urbanos.rename(columns={"QRESIDUOS_MUN": "Residuos Municipales"}, inplace=True)
-    fig = px.scatter(sum_residuos_urbanos, x="DEPARTAMENTO", y="Residuos Municipales",
-                    size="Residuos Municipales", color="DEPARTAMENTO",
-                    hover_name="DEPARTAMENTO", title="Residuos Municipales Ton/Año por Departamento",
-                    labels={"Residuos Domiciliarios": "Residuos Municipales", "DEPARTAMENTO": "Departamento"},
-                    size_max=60,
-                    color_discrete_sequence=px.colors.qualitative.Set3)
-    fig.update_yaxes(title_text="Residuos Municipales 2014 - 2021")
-    fig.update_layout(xaxis_tickangle=-45)
-    fig.update_layout(
-        xaxis=dict(title='Departamento'),
-        yaxis=dict(title='Residuos Municipales 2014 - 2021'),
-        template="plotly_dark",
-        font=dict(family="Arial", size=12, color="white"),
-    )
-    st.plotly_chart(fig)
+    mostrar_figura(('chart2', (), version), construir_chart2)
     st.markdown("*Gráfica 2: El gráfico representa los residuos Municipales por departamento expresada en millones de toneladas*")
     st.warning('El gráfico revela que Lima, la capital y la ciudad más urbanizada y poblada de Perú, generó la mayor cantidad de residuos municipales entre 2014 y 2021. Este hecho resalta su significativa producción de residuos sólidos municipales. ', icon="😀")
+# Sumar QRESIDUOS_MUN por DEPARTAMENTO para el PERIODO seleccionado (desde el cubo)
+def agrupar_chart3(selected_periodo):
+    with instrumentacion.tramo('agregacion') as t:
+        df_grouped = agregados.consultar_cubo(cubo, ['DEPARTAMENTO'], {'PERIODO': selected_periodo}, medidas=['QRESIDUOS_MUN'])
+        t.anotar(filas=len(df_grouped))
+    return df_grouped
+
 # Función para generar el tercer gráfico
 def do_chart3():
-    # df_grouped = process_data(df)
     # Crear el sidebar para el filtro de PERIODO
-    periodos = df['PERIODO'].unique()
+    periodos = agregados.consultar_cubo(cubo, ['PERIODO'], medidas=[])['PERIODO'].tolist()
     selected_periodo = st.selectbox('Selecciona un PERIODO:', periodos)
-    # Filtrar el dataframe por el PERIODO seleccionado
-    df_filtered = df[df['PERIODO'] == selected_periodo]
-    # Agrupar por DEPARTAMENTO y sumar QRESIDUOS_MUN
-    df_grouped = df_filtered.groupby('DEPARTAMENTO')['QRESIDUOS_MUN'].sum().reset_index()
-
-    # Plot with Plotly
-    fig = px.line(df_grouped, x='DEPARTAMENTO', y='QRESIDUOS_MUN', title='Residuos por departamento ')
-
-    # Add circular markers and customize the style
-    fig.update_traces(
-        mode='lines+markers',
-        marker=dict(symbol='circle', size=10, color='red'),
-        line=dict(color='blue', width=2)
-    )
-
-    # Update layout for advanced styling
-    fig.update_layout(
-        title=dict(
-            text='Residuos por departamento - '+str(selected_periodo),
-            font=dict(size=20, color='darkblue'),
-            # x=0.5  # Center the title
-        ),
-        xaxis=dict(
-            title='Departamento',
-            titlefont=dict(size=16, color='darkblue'),
-            tickfont=dict(size=14, color='black'),
-            showgrid=True,
-            gridcolor='lightgrey'
-        ),
-        yaxis=dict(
-            title='Cantidad de Residuos',
-            titlefont=dict(size=16, color='darkblue'),
-            tickfont=dict(size=14, color='black'),
-            showgrid=True,
-            gridcolor='lightgrey'
-        ),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        hovermode='x unified'
-    )
-    st.plotly_chart(fig)
+    df_grouped = agrupar_chart3(selected_periodo)
+    mostrar_figura(('chart3', (selected_periodo,), version), lambda: graficos.figura_chart3(df_grouped, selected_periodo))
     df_grouped.index = df_grouped.index + 1
-    st.write(df_grouped)
+    with instrumentacion.tramo('st.dataframe', filas=len(df_grouped)):
+        tablas.mostrar_tabla(df_grouped, ('chart3', selected_periodo, version), key='tabla_chart3')
 
     # # Mostrar el gráfico en Streamlit
     # st.write(f"QRESIDUOS_MUN by DEPARTAMENTO for PERIODO {selected_periodo}")
     st.markdown("*Gráfica 3: La gráfica muestra la cantidad de residuos sólidos municipales por departamento en el periodo seleccionado.*")
     st.info('El gráfico lineal muestra la evolución de la cantidad de residuos municipales generados en distintos períodos. Destaca notablemente la ciudad de Lima, que consistentemente ocupa el primer lugar en generación de residuos municipales en cada uno de los períodos analizados.', icon="🔎")
-# Función para generar el cuarto gráfico    
-def do_chart4():
-    # Extract the required columns
-    ubigeos_distrito_selected = dfud[['UBIGEO','PERIODO', 'DEPARTAMENTO', 'PROVINCIA','DISTRITO','GPC_DOM', 'QRESIDUOS_DOM', 'QRESIDUOS_NO_DOM', 'QRESIDUOS_MUN']]
+# Columnas que se muestran del distrito seleccionado en el cuarto gráfico
+COLUMNAS_CHART4 = ['UBIGEO', 'PERIODO', 'DEPARTAMENTO', 'PROVINCIA', 'DISTRITO', 'GPC_DOM', 'QRESIDUOS_DOM', 'QRESIDUOS_NO_DOM', 'QRESIDUOS_MUN', 'latitud', 'longitud']
+# Filas del distrito seleccionado (departamento, provincia, distrito) con el total de residuos
+def filtrar_chart4(distritos_geo, indice, seleccion):
+    with instrumentacion.tramo('filtrado') as t:
+        filas = agregados.nodo_ubicacion(indice, *seleccion)['filas']
+        distrito_filtrado = distritos_geo.iloc[filas][COLUMNAS_CHART4]
+        # Reset index to avoid showing the index column
+        distrito_filtrado.index = range(1, len(distrito_filtrado) + 1)
+        t.anotar(filas=len(distrito_filtrado))
 
-    ubigeos_ll_selected = dful[['ubigeo_inei', 'latitud', 'longitud']]
+    # Sum QRESIDUOS_MUN
+    with instrumentacion.tramo('agregacion'):
+        distrito_filtrado = distrito_filtrado.assign(QRESIDUOS_MUN_SUM=distrito_filtrado['QRESIDUOS_MUN'].sum())
+    return distrito_filtrado
 
-    # Reset index to avoid showing the index column
-    ubigeos_distrito_selected.reset_index(drop=True, inplace=True)
-    ubigeos_ll_selected.reset_index(drop=True, inplace=True)
-    ubigeos_ll_selected.index = range(1, len(ubigeos_ll_selected) + 1)
-    ubigeos_distrito_selected.index = range(1, len(ubigeos_distrito_selected) + 1)
+# Función para generar el cuarto gráfico    
+def do_chart4():
+    # Tabla ya unida con TB_UBIGEOS; aquí solo se toman las filas del distrito
+    distritos_geo = load_distritos_geo(version, dfud, dful)
     col1, col2, col3 = st.columns(3)
-    distrito_filtrado = ubigeos_distrito_selected
+    # Las opciones de cada nivel y las filas del distrito salen del índice precalculado
+    indice = load_indice_ubicaciones(version, dfud)
     with col1:
     # Filter inputs
-        departamento = st.selectbox('Seleccione Departamento', ubigeos_distrito_selected['DEPARTAMENTO'].unique())
-        distrito_filtrado = distrito_filtrado[distrito_filtrado['DEPARTAMENTO'] == departamento]
+        departamento = st.selectbox('Seleccione Departamento', indice['opciones'])
     with col2:
-        provincia = st.selectbox('Seleccione Provincia', distrito_filtrado['PROVINCIA'].unique())
-        distrito_filtrado = distrito_filtrado[distrito_filtrado['PROVINCIA'] == provincia]
+        provincia = st.selectbox('Seleccione Provincia', agregados.nodo_ubicacion(indice, departamento)['opciones'])
     with col3:
-        pass
-        distrito = st.selectbox('Seleccione Distrito', distrito_filtrado['DISTRITO'].unique())
-        distrito_filtrado = distrito_filtrado[distrito_filtrado['DISTRITO'] == distrito]
-        
-    # Sum QRESIDUOS_MUN
-    distrito_filtrado = distrito_filtrado.assign(QRESIDUOS_MUN_SUM=distrito_filtrado['QRESIDUOS_MUN'].sum())
-    # Merge the dataframes on UBIGEO and ubigeo_reniec
-    merged_df = pd.merge(distrito_filtrado, ubigeos_ll_selected, left_on='UBIGEO', right_on='ubigeo_inei')
-    st.write(merged_df)
+        distrito = st.selectbox('Seleccione Distrito', agregados.nodo_ubicacion(indice, departamento, provincia)['opciones'])
+    seleccion = (departamento, provincia, distrito)
+    distrito_filtrado = filtrar_chart4(distritos_geo, indice, seleccion)
+    with instrumentacion.tramo('st.dataframe', filas=len(distrito_filtrado)):
+        tablas.mostrar_tabla(distrito_filtrado, ('chart4',) + seleccion + (version,), key='tabla_chart4')
     # Plotting
-    if not merged_df.empty:
-        fig = px.scatter_mapbox(
-            merged_df,
-            hover_name="DISTRITO",
-            hover_data=["DEPARTAMENTO", "PROVINCIA", "QRESIDUOS_MUN_SUM"],
-            title="Total de Residuos por Distrito del 2014 al 2021",
-            lat="latitud",
-            lon="longitud",
-            zoom=11,
-            height=400,
-            color="QRESIDUOS_MUN_SUM",
-            size="QRESIDUOS_MUN_SUM",
-            # color_continuous_scale="Viridis",  # Cute color scale
-            # opacity=0.7,  # Cute opacity level
-            labels={"QRESIDUOS_MUN_SUM": "Total Residuos "},
-            center={"lat": merged_df["latitud"].mean(), "lon": merged_df["longitud"].mean()},
-        )
-        fig.update_layout(mapbox_style="open-street-map")
-        # Customize map layout
-        st.plotly_chart(fig)
-        st.info('El gráfico Scatter Mapbox muestra la cantidad total de residuos municipales generados en el distrito seleccionado durante el período 2014-2021. Esta visualización proporciona una representación geoespacial precisa de los niveles de generación de residuos en dicho distrito.', icon="🔎")
+    if not distrito_filtrado.empty:
+        # Los ubigeos sin coordenadas ya se reportaron al cargar; solo se omite el mapa
+        if distrito_filtrado['latitud'].notna().any():
+            mostrar_figura(('chart4_mapa', seleccion, version), lambda: graficos.figura_chart4_mapa(distrito_filtrado))
+            st.info('El gráfico Scatter Mapbox muestra la cantidad total de residuos municipales generados en el distrito seleccionado durante el período 2014-2021. Esta visualización proporciona una representación geoespacial precisa de los niveles de generación de residuos en dicho distrito.', icon="🔎")
         # Plot bar chart by PERIODO
-        fig = px.bar(
-        distrito_filtrado,
-        x='PERIODO',
-        y=['QRESIDUOS_DOM', 'QRESIDUOS_NO_DOM'],
-        barmode='group',
-        title='QRESIDUOS_DOM y QRESIDUOS_NO_DOM por PERIODO',
-        color_discrete_map={'QRESIDUOS_DOM': 'green', 'QRESIDUOS_NO_DOM': 'gray'}
-        )
-        # Customize hover template
-        fig.update_traces(
-            hovertemplate='<b style="color:red;">Periodo</b>: %{x}<br><b style="color:blue;">Cantidad</b>: %{y:.2f} <b style="color:black;">Ton/Año</b>'
-        )
-
-        fig.update_layout(
-        xaxis_title='Periodo',
-        yaxis_title='Cantidad',
-        yaxis_tickformat=',.2f',  # Format y-axis ticks as whole numbers
-        font=dict(size=10),  # Set font size
-        plot_bgcolor='rgba(0,0,0,0)', # Transparent background
-        legend_title_text='TIPO DE RESIDUOS'
-    )
-
-        st.plotly_chart(fig)
+        mostrar_figura(('chart4_barras', seleccion, version), lambda: graficos.figura_chart4_barras(distrito_filtrado))
         st.info('La gráfica de barras agrupadas presenta una comparación detallada de la cantidad de residuos domiciliarios y no domiciliarios generados en el distrito seleccionado durante el período 2014-2021. Cada barra del gráfico está segmentada por año, proporcionando una visión clara de la evolución temporal de ambos tipos de residuos. Esta representación permite identificar patrones y tendencias en la generación de residuos, facilitando el análisis estadístico y la toma de decisiones informadas sobre la gestión de residuos en el distrito.', icon="🔎")
     else:
         st.write("Datos no encontrado.")
 
+# Máximo de unidades que se comparan a la vez
+MAX_COMPARACION = 10
+NIVELES_COMPARACION = {'Distrito': 3, 'Provincia': 2}
+# Función para comparar la evolución de varios distritos o provincias
+def do_comparacion():
+    indice = load_indice_ubicaciones(version, dfud)
+    col1, col2, col3 = st.columns([2, 3, 3])
+    with col1:
+        nivel = st.radio('Comparar', list(NIVELES_COMPARACION), horizontal=True, key='comparacion_nivel')
+    with col2:
+        medida = st.selectbox('Medida', list(agregados.MEDIDAS_COMPARACION), format_func=agregados.MEDIDAS_COMPARACION.get,
+                              key='comparacion_medida')
+    with col3:
+        modo = st.radio('Vista', ['Superpuestas', 'Pequeños múltiplos'], horizontal=True, key='comparacion_modo')
+    rutas = agregados.rutas_ubicacion(indice, NIVELES_COMPARACION[nivel])
+    seleccion = st.multiselect(f'Selecciona hasta {MAX_COMPARACION} unidades', rutas, format_func=agregados.etiqueta_ubicacion,
+                               max_selections=MAX_COMPARACION, key=f'comparacion_{nivel}')
+    if not seleccion:
+        st.write("Selecciona al menos una unidad para comparar.")
+        return
+    # Todas las series en una sola selección de filas y un solo groupby
+    with instrumentacion.tramo('agregacion', grafico='comparacion') as t:
+        series = agregados.series_comparacion(dfud, indice, seleccion)
+        t.anotar(filas=len(series))
+    etiqueta = agregados.MEDIDAS_COMPARACION[medida]
+    multiples = modo == 'Pequeños múltiplos'
+    mostrar_figura(('comparacion', (tuple(seleccion), medida, multiples), version),
+                   lambda: graficos.figura_comparacion(series, medida, etiqueta, multiples))
+    with instrumentacion.tramo('st.dataframe', filas=len(series)):
+        tabla = series.pivot(index='PERIODO', columns='UNIDAD', values=medida)
+        # Columnas en el orden de la selección, como textos (Arrow no serializa un índice categórico)
+        tabla.columns = tabla.columns.astype(str)
+        st.dataframe(tabla)
+
+# Figuras de las pestañas de 'Inicio' con sus selecciones por defecto, para la precarga:
+# la preparación de datos (cubo, filas del distrito) se hace aquí; los hilos solo
+# construyen y serializan las figuras. Se preparan una vez por versión de los datos.
+@st.cache_resource(max_entries=2)
+def tareas_precarga(version):
+    tareas = [(('chart1', (), version), construir_chart1), (('chart2', (), version), construir_chart2)]
+    periodo = agregados.consultar_cubo(cubo, ['PERIODO'], medidas=[])['PERIODO'].tolist()[0]
+    df_grouped = agrupar_chart3(periodo)
+    tareas.append((('chart3', (periodo,), version), lambda: graficos.figura_chart3(df_grouped, periodo)))
+    indice = load_indice_ubicaciones(version, dfud)
+    departamento = indice['opciones'][0]
+    provincia = agregados.nodo_ubicacion(indice, departamento)['opciones'][0]
+    seleccion = (departamento, provincia, agregados.nodo_ubicacion(indice, departamento, provincia)['opciones'][0])
+    distrito_filtrado = filtrar_chart4(load_distritos_geo(version, dfud, dful), indice, seleccion)
+    if distrito_filtrado['latitud'].notna().any():
+        tareas.append((('chart4_mapa', seleccion, version), lambda: graficos.figura_chart4_mapa(distrito_filtrado)))
+    tareas.append((('chart4_barras', seleccion, version), lambda: graficos.figura_chart4_barras(distrito_filtrado)))
+    return tareas
+
+# Función para generar el mapa nacional: todos los distritos agrupados en celdas
+def do_mapa_nacional():
+    celdas = load_celdas_mapa(version, load_distritos_geo(version, dfud, dful))
+    col1, col2, col3 = st.columns([2, 3, 3])
+    with col1:
+        selected_periodo = st.selectbox('Selecciona un PERIODO:', sorted(celdas[next(iter(celdas))], reverse=True),
+                                        key='mapa_periodo')
+    with col2:
+        medida = st.radio('Medida', list(agregados.MEDIDAS_MAPA), format_func=agregados.MEDIDAS_MAPA.get,
+                          horizontal=True, key='mapa_medida')
+    with col3:
+        nivel = st.select_slider('Nivel de detalle', list(agregados.NIVELES_MAPA), key='mapa_nivel')
+    # Cambiar de PERIODO, medida o nivel solo cambia qué tabla de celdas (ya calculada) se dibuja
+    celdas_periodo = celdas[nivel][selected_periodo]
+    with instrumentacion.tramo('filtrado') as t:
+        t.anotar(filas=len(celdas_periodo))
+    mostrar_figura(('mapa_nacional', (selected_periodo, medida, nivel), version),
+                   lambda: graficos.figura_mapa_nacional(celdas_periodo, medida, agregados.MEDIDAS_MAPA[medida],
+                                                         selected_periodo, agregados.NIVELES_MAPA[nivel]['zoom']))
+    st.info(f'El mapa agrupa los distritos del país en {len(celdas_periodo)} celdas de '
+            f'{agregados.NIVELES_MAPA[nivel]["celda"]}° de lado; cada punto está en el centroide de sus distritos. '
+            'Con un nivel de detalle mayor las celdas son más pequeñas.', icon="🔎")
+
+# Función para mostrar los rankings de indicadores por departamento, provincia o distrito
+def do_rankings():
+    indicadores = load_indicadores(version, cubo)
+    col1, col2, col3, col4 = st.columns([2, 3, 2, 2])
+    with col1:
+        nivel = st.selectbox('Nivel', list(agregados.NIVELES_RANKING), key='ranking_nivel')
+    with col2:
+        indicador = st.selectbox('Indicador', list(agregados.INDICADORES), format_func=agregados.INDICADORES.get,
+                                 key='ranking_indicador')
+    with col3:
+        selected_periodo = st.selectbox('Selecciona un PERIODO:', indicadores['periodos'][::-1], key='ranking_periodo')
+    with col4:
+        k = st.number_input('Cantidad', min_value=3, max_value=50, value=10, step=1, key='ranking_k')
+    etiqueta = agregados.INDICADORES[indicador]
+    for mayores, titulo in ((True, 'Mayores'), (False, 'Menores')):
+        with instrumentacion.tramo('agregacion', grafico='ranking') as t:
+            tabla = agregados.ranking(indicadores, nivel, indicador, selected_periodo, k, mayores)
+            t.anotar(filas=len(tabla))
+        if tabla.empty:
+            st.write("Datos no encontrado.")
+            break
+        mostrar_figura(('ranking', (nivel, indicador, selected_periodo, k, mayores), version),
+                       lambda: graficos.figura_ranking(tabla, indicador, etiqueta,
+                                                       f'{titulo} {k}: {etiqueta} - {selected_periodo}'))
+        with instrumentacion.tramo('st.dataframe', filas=len(tabla)):
+            st.dataframe(tabla, hide_index=True)
+    st.info('El crecimiento interanual compara los residuos municipales con los del periodo anterior; '
+            'el indicador per cápita divide los residuos municipales entre la población total.', icon="🔎")
+
+# Función para mostrar la proyección de residuos de un departamento, provincia o distrito
+def do_proyecciones():
+    proyecciones = load_proyecciones(version, load_indicadores(version, cubo))
+    indice = load_indice_ubicaciones(version, dfud)
+    col1, col2 = st.columns([2, 3])
+    with col1:
+        nivel = st.radio('Nivel', list(agregados.NIVELES_RANKING), horizontal=True, index=2, key='proyeccion_nivel')
+    with col2:
+        medida = st.radio('Medida', list(agregados.MEDIDAS_PROYECCION), format_func=agregados.MEDIDAS_PROYECCION.get,
+                          horizontal=True, key='proyeccion_medida')
+    # Selectbox en cascada hasta el nivel elegido, con las opciones del índice de ubicaciones
+    ruta = ()
+    columnas = st.columns(3)
+    for i, nombre in enumerate(agregados.NIVELES_RANKING[nivel]):
+        with columnas[i]:
+            opciones = agregados.nodo_ubicacion(indice, *ruta)['opciones']
+            ruta += (st.selectbox(f'Seleccione {nombre.capitalize()}', opciones, key=f'proyeccion_{nombre}'),)
+    # La proyección ya está calculada: solo se toman los coeficientes de la unidad
+    with instrumentacion.tramo('agregacion', grafico='proyeccion'):
+        tabla = agregados.proyeccion(proyecciones, nivel, ruta, medida)
+    if tabla is None:
+        st.write(f"No hay datos suficientes para proyectar (al menos {agregados.MIN_PERIODOS_AJUSTE} periodos).")
+        return
+    etiqueta = agregados.MEDIDAS_PROYECCION[medida]
+    mostrar_figura(('proyeccion', (nivel, ruta, medida), version),
+                   lambda: graficos.figura_proyeccion(tabla, etiqueta, f'{etiqueta} - {agregados.etiqueta_ubicacion(ruta)}'))
+    ajuste = proyecciones['niveles'][nivel]['ajustes'][medida]
+    fila = proyecciones['niveles'][nivel]['posiciones'][ruta]
+    st.info(f"Tendencia lineal de {proyecciones['periodos'][0]}-{proyecciones['periodos'][-1]} "
+            f"({int(ajuste['periodos_ajuste'][fila])} periodos con dato): {ajuste['pendiente'][fila]:+,.2f} por año. "
+            f"La banda abarca ±2 desvíos de los residuos del ajuste.", icon="🔎")
+    with instrumentacion.tramo('st.dataframe', filas=len(tabla)):
+        st.dataframe(tabla[tabla['PROYECTADO']].drop(columns=['OBSERVADO', 'PROYECTADO']), hide_index=True)
+
 # Función para mostrar información sobre el proyecto
 def do_acerca():
-    st.image('basura.jpg', caption="Basura en la playa", use_column_width=True)
+    mostrar_imagen(recursos.imagen('basura.jpg'), caption="Basura en la playa")
     st.link_button("Ir a código del proyecto", "https://github.com/summermp/streamlit", type='primary')
     st.markdown("""
 <p class='desc_text'> La base de datos de composición de residuos sólidos domiciliarios corresponde a la información sobre la distribución de los residuos sólidos del ámbito domiciliario generados por tipo (medido en tonelada). Dicha información, fue obtenida desde los años 2014 hasta el 2021, con respecto a todos los departamentos de nuestro país.</br></br>
@@ -277,7 +397,7 @@ def do_nosotros():
     st.markdown("<p class='desc_text'>Somos estudiantes del quinto semestre de la carrera de ingeniería ambiental de la Universidad Peruana Cayetano Heredia (UPCH). Nos apasiona el procesamiento y visualización de datos para mejorar y comprender la problemática ambiental y brindar información sobre los residuos sólidos generados en el Perú.</p>", unsafe_allow_html=True)
     col1, col2 = st.columns([2, 2])
     with col1:
-        st.image("meyli.jpeg")
+        mostrar_imagen(recursos.imagen('meyli.jpeg'))
     with col2:
         st.write("")
         st.markdown("""
@@ -288,7 +408,7 @@ def do_nosotros():
         
     col1, col2 = st.columns([2, 2])
     with col1:
-        st.image("lory.jpeg")
+        mostrar_imagen(recursos.imagen('lory.jpeg'))
     with col2:
         st.write("")
         st.markdown("""
@@ -299,7 +419,7 @@ def do_nosotros():
  
     col1, col2 = st.columns([2, 2])
     with col1:
-        st.image("maximiliana.jpeg")
+        mostrar_imagen(recursos.imagen('maximiliana.jpeg'))
     with col2:
         st.write("")
         st.markdown("""
@@ -309,7 +429,7 @@ def do_nosotros():
         """)
     col1, col2 = st.columns([2, 2])
     with col1:
-        st.image("mayerly.jpeg")
+        mostrar_imagen(recursos.imagen('mayerly.jpeg'))
     with col2:
         st.write("")
         st.markdown("""
@@ -357,10 +477,14 @@ menu = {
             'submenu': {  # Submenú asociado al elemento 'Inicio'
                 'title': None,  # Título del submenú (None indica sin título)
                 'items': {  # Elementos del submenú
-                    'Gráfico 1' : {'action': do_chart1, 'item_icon': 'pie-chart-fill', 'submenu': None},  # Elemento 1 del submenú
-                    'Gráfico 2' : {'action': do_chart2, 'item_icon': 'bar-chart-fill', 'submenu': None},  # Elemento 2 del submenú
-                    'Gráfico 3' : {'action': do_chart3, 'item_icon': 'bar-chart-line', 'submenu': None},  # Elemento 3 del submenú
-                    'Gráfico 4' : {'action': do_chart4, 'item_icon': 'bar-chart-line-fill', 'submenu': None} # Elemento 4 del submenú
+                    'Gráfico 1' : {'action': do_chart1, 'item_icon': 'pie-chart-fill', 'submenu': None, 'fragment': True},  # Elemento 1 del submenú
+                    'Gráfico 2' : {'action': do_chart2, 'item_icon': 'bar-chart-fill', 'submenu': None, 'fragment': True},  # Elemento 2 del submenú
+                    'Gráfico 3' : {'action': do_chart3, 'item_icon': 'bar-chart-line', 'submenu': None, 'fragment': True},  # Elemento 3 del submenú
+                    'Gráfico 4' : {'action': do_chart4, 'item_icon': 'bar-chart-line-fill', 'submenu': None, 'fragment': True}, # Elemento 4 del submenú
+                    'Mapa nacional' : {'action': do_mapa_nacional, 'item_icon': 'globe-americas', 'submenu': None, 'fragment': True}, # Elemento 5 del submenú
+                    'Rankings' : {'action': do_rankings, 'item_icon': 'trophy', 'submenu': None, 'fragment': True}, # Elemento 6 del submenú
+                    'Comparación' : {'action': do_comparacion, 'item_icon': 'graph-up', 'submenu': None, 'fragment': True}, # Elemento 7 del submenú
+                    'Proyecciones' : {'action': do_proyecciones, 'item_icon': 'graph-up-arrow', 'submenu': None, 'fragment': True} # Elemento 8 del submenú
                 },
                 'menu_icon': None,  # Ícono asociado al submenú (None indica sin ícono)
                 'default_index': 0,  # Índice predeterminado al cargar el submenú
@@ -406,6 +530,23 @@ menu = {
     'orientation': 'vertical',  # Orientación del menú principal (vertical en este caso)
     'styles': styles  # Estilos del menú principal
 }
+# Envuelve una acción del menú en un fragmento: al cambiar uno de sus widgets solo se
+# vuelve a ejecutar la acción, no el script completo (estilos, logo, menús y cargas).
+# En el rerun de un fragmento el script no pasa por iniciar_rerun, así que la traza de
+# depuración se abre y se cierra aquí y su tiempo se muestra dentro del fragmento.
+def como_fragmento(accion):
+    @functools.wraps(accion)
+    def ejecutar():
+        parcial = not instrumentacion.en_rerun()
+        if parcial:
+            instrumentacion.iniciar_rerun(modo_debug, st.session_state.get('id_sesion'))
+        with instrumentacion.tramo('fragmento', opcion=accion.__name__):
+            accion()
+        if parcial:
+            traza = instrumentacion.finalizar_rerun()
+            if traza is not None:
+                st.caption(f"Depuración: rerun del fragmento {traza['total_ms']:.0f} ms")
+    return st.fragment(ejecutar)
 # Definición de una función para mostrar un menú interactivo
 def show_menu(menu):
     # Función interna para obtener las opciones del menú
@@ -429,30 +570,40 @@ def show_menu(menu):
     # Obtener el tipo de panel de vista (sidebar o main)
     with_view_panel = menu['with_view_panel']
     # Mostrar el menú en el panel correspondiente
-    if with_view_panel == 'sidebar':
-        with st.sidebar:
+    with instrumentacion.tramo('option_menu', menu=str(menu['title'])):
+        if with_view_panel == 'sidebar':
+            with st.sidebar:
+                menu_selection = option_menu(**kwargs)
+        elif with_view_panel == 'main':
             menu_selection = option_menu(**kwargs)
-    elif with_view_panel == 'main':
-        menu_selection = option_menu(**kwargs)
-    else:
-        # Lanzar una excepción si el tipo de panel de vista no es reconocido
-        raise ValueError(f"Unknown view panel value: {with_view_panel}. Must be 'sidebar' or 'main'.")
+        else:
+            # Lanzar una excepción si el tipo de panel de vista no es reconocido
+            raise ValueError(f"Unknown view panel value: {with_view_panel}. Must be 'sidebar' or 'main'.")
     # Lógica para manejar la selección del menú "Inicio"
     if menu_selection == 'Inicio':
         if menu['items'][menu_selection]['submenu']:
             pass
+    # Ruta de opciones elegidas (p. ej. ['Inicio', 'Gráfico 1'])
+    ruta = [menu_selection]
     # Lógica para mostrar submenú si está presente
     if menu['items'][menu_selection]['submenu']:
-        show_menu(menu['items'][menu_selection]['submenu'])
+        ruta += show_menu(menu['items'][menu_selection]['submenu'])
     # Lógica para ejecutar la acción asociada si está presente
     if menu['items'][menu_selection]['action']:
-        menu['items'][menu_selection]['action']()
-# Mostrar una imagen en la barra lateral usando Streamlit
-st.sidebar.image('https://www.precayetanovirtual.pe/moodle/pluginfile.php/1/theme_mb2nl/loadinglogo/1692369360/logo-cayetano.png', use_column_width=True)
+        accion = menu['items'][menu_selection]['action']
+        # Las acciones marcadas con 'fragment' se ejecutan aisladas en un fragmento
+        if menu['items'][menu_selection].get('fragment'):
+            accion = como_fragmento(accion)
+        with instrumentacion.tramo('accion', opcion=menu_selection):
+            accion()
+    return ruta
+# Mostrar el logo de la universidad en la barra lateral (copia local del logo remoto,
+# que se renueva en segundo plano; si no hay copia se muestra logo.jpeg)
+mostrar_imagen(recursos.logo_remoto(), contenedor=st.sidebar)
 # Llamar a la función para mostrar el menú interactivo
-show_menu(menu)
+ruta_menu = show_menu(menu)
 # Crear tres columnas en la barra lateral (1:8:1 ratio)
-st.sidebar.image('logo.jpeg', use_column_width=True)
+mostrar_imagen(recursos.imagen('logo.jpeg'), contenedor=st.sidebar)
 # col1, col2, col3 = st.sidebar.columns([2, 4, 2])
 # # Espacio en blanco en la primera y tercera columna para centrar la imagen
 # with col1:
@@ -464,3 +615,16 @@ st.sidebar.image('logo.jpeg', use_column_width=True)
 #     st.write("")
 # # Mostrar un texto en la barra lateral después de las columnas y agregar efecto de nieve
 st.sidebar.text("Ing. ambiental - 2024")  
+# Con la pestaña ya mostrada, precargar en segundo plano las figuras de las demás.
+# Solo desde 'Inicio': en Acerca/Nosotros no se llega a importar Plotly.
+if ruta_menu[0] == 'Inicio':
+    with instrumentacion.tramo('precarga'):
+        precargador.programar(version, tareas_precarga(version))
+# Panel de depuración (solo con ?debug=1): tramos del rerun y estado de la caché de figuras
+traza = instrumentacion.finalizar_rerun()
+if traza is not None:
+    with st.sidebar.expander(f"Depuración: rerun {traza['total_ms']:.0f} ms"):
+        st.dataframe([{**t, 'nombre': '  ' * t['profundidad'] + t['nombre']} for t in traza['tramos']],
+                     column_order=['nombre', 'ms', 'filas', 'json_bytes', 'grafico', 'opcion', 'menu', 'archivo'])
+        st.write(cache_figuras.estadisticas())
+        st.write(precargador.estadisticas())
@@ -0,0 +1 @@
+# Benchmarks sin navegador de la carga de datos, las agregaciones y las figuras de app.py
@@ -0,0 +1,31 @@
+# Uso:  python -m benchmarks [--escalas 10 100 1000] [--repeticiones 3] [--salida reporte.json]
+import argparse
+import json
+import sys
+
+from benchmarks.suite import ESCALAS, correr_suite
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de carga, agregación y figuras de app.py")
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS,
+                        help="Multiplicadores de filas del dataset sintético (1 = datos reales)")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Repeticiones por etapa (se reporta la mejor)")
+    parser.add_argument('--carpeta', default=None, help="Carpeta para los CSV sintéticos (por defecto una temporal)")
+    parser.add_argument('--salida', default=None, help="Archivo JSON del reporte (por defecto, salida estándar)")
+    args = parser.parse_args(argv)
+
+    def progreso(r):
+        print(f"x{r['escala']:<5} {r['etapa']:<30} {r['segundos'] * 1000:10.2f} ms "
+              f"{r['pico_bytes'] / 2**20:9.1f} MB", file=sys.stderr)
+
+    reporte = correr_suite(args.escalas, args.repeticiones, args.carpeta, progreso)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2)
+    else:
+        json.dump(reporte, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
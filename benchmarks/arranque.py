@@ -0,0 +1,100 @@
+# Perfil de arranque en frío de app.py: por página, en un proceso nuevo, el tiempo hasta
+# el primer render y el tiempo de importación de cada módulo de primer nivel
+# (python -X importtime), comparado con un presupuesto.
+# Uso:  python -m benchmarks.arranque [--presupuesto-ms 4000] [--salida arranque.json]
+# El comando termina con código 1 si alguna página supera el presupuesto o si Acerca/Nosotros
+# importan Plotly.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import datos
+
+# Página -> acción de app.py. El menú es un componente que AppTest no puede operar, así
+# que la acción se ejecuta directamente en lugar de show_menu(menu).
+PAGINAS = {
+    'Gráfico 1': ('Inicio', 'do_chart1'),
+    'Gráfico 4': ('Inicio', 'do_chart4'),
+    'Acerca': ('Acerca', 'do_acerca'),
+    'Nosotros': ('Nosotros', 'do_nosotros'),
+}
+# Módulos de gráficos que no deberían cargarse en páginas sin gráficos. Streamlit ya
+# importa la base de Plotly (plotly.graph_objects sin las clases de figuras, ~15 ms);
+# lo costoso son plotly.express y las clases de figuras.
+MODULOS_GRAFICOS = ['plotly.express', 'plotly.graph_objs._figure', 'matplotlib.pyplot']
+PRESUPUESTO_MS = 4000
+
+
+# Se ejecuta en el proceso hijo: corre app.py con AppTest e imprime el resultado en JSON
+def _medir_pagina(pagina):
+    from streamlit.testing.v1 import AppTest
+
+    menu, accion = PAGINAS[pagina]
+    os.chdir(datos.BASE_DIR)
+    with open(os.path.join(datos.BASE_DIR, 'app.py'), encoding='utf-8') as f:
+        fuente = f.read().replace('\nruta_menu = show_menu(menu)\n', f'\nruta_menu = [{menu!r}]\n{accion}()\n')
+    inicio = time.perf_counter()
+    prueba = AppTest.from_string(fuente, default_timeout=120).run()
+    primer_render = time.perf_counter() - inicio
+    print(json.dumps({
+        'primer_render_ms': primer_render * 1000,
+        'excepciones': [e.message for e in prueba.exception],
+        'modulos_graficos': [m for m in MODULOS_GRAFICOS if m in sys.modules],
+    }))
+
+
+# Tiempos de `python -X importtime`: {módulo de primer nivel: ms acumulados}
+def _tiempos_importacion(salida):
+    tiempos = {}
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:') or 'cumulative' in linea:
+            continue
+        _propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        # Un espacio de separación y ninguna sangría: importación de primer nivel
+        if len(nombre) - len(nombre.lstrip()) == 1:
+            tiempos[nombre.strip()] = tiempos.get(nombre.strip(), 0) + int(acumulado) / 1000
+    return tiempos
+
+
+def _con_graficos(pagina):
+    return PAGINAS[pagina][0] == 'Inicio'
+
+def perfil_arranque(paginas=None, presupuesto_ms=PRESUPUESTO_MS):
+    reporte = {'presupuesto_ms': presupuesto_ms, 'paginas': {}}
+    for pagina in paginas or PAGINAS:
+        proceso = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'benchmarks.arranque', '--hijo', pagina],
+                                 cwd=datos.BASE_DIR, capture_output=True, text=True, check=True)
+        resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+        importaciones = _tiempos_importacion(proceso.stderr)
+        resultado['importacion_ms'] = dict(sorted(importaciones.items(), key=lambda item: -item[1])[:15])
+        resultado['dentro_del_presupuesto'] = (resultado['primer_render_ms'] <= presupuesto_ms
+                                               and not resultado['excepciones']
+                                               and (_con_graficos(pagina) or not resultado['modulos_graficos']))
+        reporte['paginas'][pagina] = resultado
+    return reporte
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Perfil de arranque en frío de app.py")
+    parser.add_argument('--paginas', nargs='+', choices=list(PAGINAS), default=None)
+    parser.add_argument('--presupuesto-ms', type=float, default=PRESUPUESTO_MS,
+                        help="Tiempo máximo hasta el primer render de cada página")
+    parser.add_argument('--salida', default=None, help="Archivo JSON del reporte (por defecto, salida estándar)")
+    parser.add_argument('--hijo', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.hijo:
+        _medir_pagina(args.hijo)
+        sys.exit(0)
+    reporte = perfil_arranque(args.paginas, args.presupuesto_ms)
+    for pagina, resultado in reporte['paginas'].items():
+        estado = 'OK' if resultado['dentro_del_presupuesto'] else 'EXCEDE'
+        print(f"{pagina:<10} {resultado['primer_render_ms']:8.0f} ms  {estado:<7} "
+              f"gráficos: {', '.join(resultado['modulos_graficos']) or '-'}", file=sys.stderr)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(reporte, sys.stdout, indent=2, ensure_ascii=False)
+    sys.exit(0 if all(r['dentro_del_presupuesto'] for r in reporte['paginas'].values()) else 1)
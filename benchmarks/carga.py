@@ -0,0 +1,170 @@
+# Prueba de carga de app.py: N sesiones simultáneas recorren un guion de navegación y se
+# reporta la latencia de cada rerun (p50/p95/p99), el throughput y la memoria. Corre sin
+# red ni navegador. AppTest no admite varias instancias en hilos de un mismo proceso, así
+# que cada sesión corre en su propio proceso: las sesiones compiten por la CPU y por los
+# archivos (snapshots, almacén, variantes) pero no comparten las cachés en memoria de
+# Streamlit, como N workers de una sesión cada uno.
+# Uso:  python -m benchmarks.carga [--sesiones 1 4 8 16] [--vueltas 3] [--salida carga.json]
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+
+import numpy as np
+
+import datos
+
+# El menú es un componente que AppTest no puede operar: la pestaña se elige con una
+# clave de session_state en lugar de show_menu(menu)
+CLAVE_PESTANA = 'carga_pestana'
+REEMPLAZO_MENU = f"\nruta_menu = ['Inicio']\nglobals()[st.session_state.get({CLAVE_PESTANA!r}, 'do_chart1')]()\n"
+
+# Guion de navegación de una vuelta: cambiar entre los gráficos 1 a 4, elegir otro PERIODO
+# en el gráfico 3 y recorrer departamento / provincia / distrito en el gráfico 4. Cada
+# sesión elige los valores al azar (con su propia semilla) entre las opciones del widget.
+GUION = [
+    ('pestana', 'do_chart1'),
+    ('pestana', 'do_chart2'),
+    ('pestana', 'do_chart3'),
+    ('selectbox', 'Selecciona un PERIODO:'),
+    ('pestana', 'do_chart4'),
+    ('selectbox', 'Seleccione Departamento'),
+    ('selectbox', 'Seleccione Provincia'),
+    ('selectbox', 'Seleccione Distrito'),
+]
+SESIONES = [1, 4, 8]
+
+
+def _fuente_app():
+    with open(os.path.join(datos.BASE_DIR, 'app.py'), encoding='utf-8') as f:
+        fuente = f.read()
+    if '\nruta_menu = show_menu(menu)\n' not in fuente:
+        raise RuntimeError("No se encontró la llamada a show_menu(menu) en app.py")
+    return fuente.replace('\nruta_menu = show_menu(menu)\n', REEMPLAZO_MENU)
+
+def _rss_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+def _selectbox(prueba, etiqueta):
+    for widget in prueba.selectbox:
+        if widget.label == etiqueta:
+            return widget
+    raise RuntimeError(f"No hay un selectbox {etiqueta!r} en la página (hay: {[w.label for w in prueba.selectbox]})")
+
+
+# Una sesión: primer render y el guion `vueltas` veces. Devuelve la duración de cada rerun
+def _sesion(fuente, semilla, vueltas, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    azar = random.Random(semilla)
+    latencias = []
+    prueba = AppTest.from_string(fuente, default_timeout=timeout)
+
+    def rerun():
+        inicio = time.perf_counter()
+        prueba.run()
+        latencias.append(time.perf_counter() - inicio)
+        if prueba.exception:
+            raise RuntimeError(prueba.exception[0].message)
+
+    rerun()
+    for _ in range(vueltas):
+        for accion, objetivo in GUION:
+            if accion == 'pestana':
+                prueba.session_state[CLAVE_PESTANA] = objetivo
+            else:
+                widget = _selectbox(prueba, objetivo)
+                widget.select(azar.choice(widget.options))
+            rerun()
+    return latencias
+
+# Proceso de una sesión: importa Streamlit, espera a las demás en `barrera` y deja en
+# `cola` sus latencias, el intervalo en que corrió y su memoria pico (o el error)
+def _proceso(fuente, semilla, vueltas, timeout, barrera, cola):
+    import streamlit.testing.v1  # noqa: F401  (la importación no se mide)
+
+    barrera.wait()
+    inicio = time.time()
+    try:
+        latencias = _sesion(fuente, semilla, vueltas, timeout)
+    except Exception as e:
+        cola.put({'semilla': semilla, 'error': repr(e)})
+        return
+    # ru_maxrss está en KB en Linux
+    cola.put({'semilla': semilla, 'latencias': latencias, 'inicio': inicio, 'fin': time.time(),
+              'rss_pico_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024})
+
+# Corre `n` sesiones en procesos aparte, que arrancan juntas
+def _sesiones_en_procesos(fuente, n, semilla, vueltas, timeout):
+    contexto = multiprocessing.get_context('spawn')
+    barrera = contexto.Barrier(n)
+    cola = contexto.Queue()
+    procesos = [contexto.Process(target=_proceso, args=(fuente, semilla + i, vueltas, timeout, barrera, cola),
+                                 name=f'sesion-{i}') for i in range(n)]
+    for proceso in procesos:
+        proceso.start()
+    resultados = [cola.get() for _ in procesos]
+    for proceso in procesos:
+        proceso.join()
+    errores = [r for r in resultados if 'error' in r]
+    if errores:
+        raise RuntimeError(f"{len(errores)} de {n} sesiones fallaron: {errores[0]['error']}")
+    return resultados
+
+
+def _percentiles_ms(latencias):
+    valores = np.array(latencias) * 1000
+    return {f'p{p}': float(np.percentile(valores, p)) for p in (50, 95, 99)} | {'max': float(valores.max())}
+
+# Corre el guion con cada cantidad de sesiones simultáneas. Antes de medir, una sesión de
+# calentamiento deja escritos los snapshots, el almacén y las variantes de imágenes.
+# La latencia incluye el primer render de cada sesión (con las cachés del proceso vacías).
+def prueba_carga(sesiones=SESIONES, vueltas=3, semilla=0, timeout=120):
+    fuente = _fuente_app()
+    os.chdir(datos.BASE_DIR)
+    inicio = time.perf_counter()
+    calentamiento = _sesiones_en_procesos(fuente, 1, semilla, 1, timeout)[0]
+    reporte = {
+        'reruns_por_sesion': 1 + vueltas * len(GUION),
+        'calentamiento_s': time.perf_counter() - inicio,
+        'rss_pico_sesion_bytes': calentamiento['rss_pico_bytes'],
+        'niveles': {},
+    }
+    for n in sesiones:
+        resultados = _sesiones_en_procesos(fuente, n, semilla + 1, vueltas, timeout)
+        segundos = max(r['fin'] for r in resultados) - min(r['inicio'] for r in resultados)
+        latencias = [l for resultado in resultados for l in resultado['latencias']]
+        reporte['niveles'][n] = {
+            'reruns': len(latencias),
+            'segundos': segundos,
+            'reruns_por_segundo': len(latencias) / segundos,
+            'latencia_ms': _percentiles_ms(latencias),
+            'rss_pico_total_bytes': sum(r['rss_pico_bytes'] for r in resultados),
+        }
+    return reporte
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prueba de carga de app.py con sesiones simultáneas")
+    parser.add_argument('--sesiones', type=int, nargs='+', default=SESIONES,
+                        help="Cantidades de sesiones simultáneas a probar")
+    parser.add_argument('--vueltas', type=int, default=3, help="Vueltas del guion de navegación por sesión")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', default=None, help="Archivo JSON del reporte (por defecto, salida estándar)")
+    args = parser.parse_args()
+    reporte = prueba_carga(args.sesiones, args.vueltas, args.semilla)
+    for n, nivel in reporte['niveles'].items():
+        latencia = nivel['latencia_ms']
+        print(f"{n:>3} sesiones  p50 {latencia['p50']:7.0f} ms  p95 {latencia['p95']:7.0f} ms  "
+              f"p99 {latencia['p99']:7.0f} ms  {nivel['reruns_por_segundo']:6.1f} reruns/s  "
+              f"RSS {nivel['rss_pico_total_bytes'] / 2**20:6.0f} MB", file=sys.stderr)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2)
+    else:
+        json.dump(reporte, sys.stdout, indent=2)
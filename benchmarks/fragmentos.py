@@ -0,0 +1,98 @@
+# Tiempo de rerun al cambiar un widget de un gráfico, con y sin fragmentos. Sin fragmentos,
+# cada cambio vuelve a ejecutar app.py completo (estilos, logo, menús, cargas y la acción);
+# con la acción en un fragmento (app.como_fragmento) solo se ejecuta la acción.
+# AppTest siempre ejecuta el script completo, así que de cada rerun (trazas de
+# instrumentacion con ?debug=1) se toma el total y el tramo 'fragmento', que es lo único
+# que se ejecuta en el rerun del fragmento.
+# Uso:  python -m benchmarks.fragmentos [--cambios 10] [--salida fragmentos.json]
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+import datos
+import instrumentacion
+
+# Pestaña -> widgets que se cambian en cada paso (por etiqueta, en orden)
+PESTANAS = {
+    'do_chart3': ['Selecciona un PERIODO:'],
+    'do_chart4': ['Seleccione Departamento', 'Seleccione Provincia', 'Seleccione Distrito'],
+}
+
+
+def _fuente_app(accion):
+    with open(os.path.join(datos.BASE_DIR, 'app.py'), encoding='utf-8') as f:
+        fuente = f.read()
+    # El menú es un componente que AppTest no puede operar: la acción se ejecuta directamente,
+    # envuelta en un fragmento como lo hace show_menu
+    return fuente.replace('\nruta_menu = show_menu(menu)\n', f"\nruta_menu = ['Inicio']\ncomo_fragmento({accion})()\n")
+
+def _leer_trazas(ruta):
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f]
+
+def _resumen_ms(valores):
+    valores = np.array(valores)
+    return {'p50': float(np.percentile(valores, 50)), 'p95': float(np.percentile(valores, 95)),
+            'media': float(valores.mean())}
+
+
+# Cambia `cambios` veces los widgets de cada pestaña (valores al azar) y devuelve por
+# pestaña el tiempo del rerun completo y el de la acción sola
+def medir_fragmentos(cambios=10, semilla=0):
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(datos.BASE_DIR)
+    azar = random.Random(semilla)
+    ruta_trazas = os.path.join(tempfile.mkdtemp(prefix='fragmentos_'), 'trazas.jsonl')
+    ruta_anterior = instrumentacion.RUTA_JSONL
+    instrumentacion.RUTA_JSONL = ruta_trazas
+    reporte = {'cambios': cambios, 'pestanas': {}}
+    try:
+        for accion, etiquetas in PESTANAS.items():
+            prueba = AppTest.from_string(_fuente_app(accion), default_timeout=120)
+            prueba.query_params['debug'] = '1'
+            # Primer render (cargas y cachés en frío): no se cuenta
+            prueba.run()
+            vistas = len(_leer_trazas(ruta_trazas))
+            for _ in range(cambios):
+                for etiqueta in etiquetas:
+                    widget = next(w for w in prueba.selectbox if w.label == etiqueta)
+                    widget.select(azar.choice(widget.options)).run()
+                    if prueba.exception:
+                        raise RuntimeError(prueba.exception[0].message)
+            trazas = _leer_trazas(ruta_trazas)[vistas:]
+            completo = [t['total_ms'] for t in trazas]
+            fragmento = [next(tramo['ms'] for tramo in t['tramos'] if tramo['nombre'] == 'fragmento') for t in trazas]
+            reporte['pestanas'][accion] = {
+                'reruns': len(trazas),
+                'sin_fragmentos_ms': _resumen_ms(completo),
+                'con_fragmentos_ms': _resumen_ms(fragmento),
+                'fraccion_del_rerun': float(np.sum(fragmento) / np.sum(completo)),
+            }
+    finally:
+        instrumentacion.RUTA_JSONL = ruta_anterior
+    return reporte
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tiempo de rerun de los gráficos con y sin fragmentos")
+    parser.add_argument('--cambios', type=int, default=10, help="Cambios de widgets por pestaña")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', default=None, help="Archivo JSON del reporte (por defecto, salida estándar)")
+    args = parser.parse_args()
+    reporte = medir_fragmentos(args.cambios, args.semilla)
+    for accion, resultado in reporte['pestanas'].items():
+        print(f"{accion:<10} sin fragmentos p50 {resultado['sin_fragmentos_ms']['p50']:7.1f} ms   "
+              f"con fragmentos p50 {resultado['con_fragmentos_ms']['p50']:7.1f} ms", file=sys.stderr)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2)
+    else:
+        json.dump(reporte, sys.stdout, indent=2)
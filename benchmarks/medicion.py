@@ -0,0 +1,27 @@
+# Utilidades de medición: tiempo (mejor de N repeticiones) y memoria pico por etapa
+import time
+import tracemalloc
+
+
+# Ejecuta `fn` `repeticiones` veces sin trazar memoria (para el tiempo) y una vez más
+# con tracemalloc (para la memoria pico). `preparar` se llama antes de cada ejecución,
+# fuera de la medición, para etapas que no son idempotentes (p. ej. escribir un snapshot).
+def medir(fn, repeticiones=3, preparar=None):
+    tiempos = []
+    valor = None
+    for _ in range(max(1, repeticiones)):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        valor = fn()
+        tiempos.append(time.perf_counter() - inicio)
+    if preparar is not None:
+        preparar()
+    tracemalloc.start()
+    try:
+        fn()
+        _actual, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return valor, {'segundos': min(tiempos), 'segundos_mediana': sorted(tiempos)[len(tiempos) // 2],
+                   'pico_bytes': pico}
@@ -0,0 +1,57 @@
+# Memoria por sesión de los datos de app.py: copia por llamada (como st.cache_data, que
+# guarda el DataFrame serializado y lo deserializa en cada llamada) frente a una sola
+# copia de solo lectura compartida (st.cache_resource + vistas superficiales).
+# Uso:  python -m benchmarks.sesiones [--sesiones 20] [--escala 10]
+import argparse
+import json
+import pickle
+import sys
+import time
+import tracemalloc
+
+import datos
+from benchmarks import sinteticos
+
+
+def _modo_copia(df):
+    serializado = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+    return lambda: pickle.loads(serializado)
+
+def _modo_compartido(df):
+    compartido = datos.solo_lectura(df)
+    return lambda: compartido.copy(deep=False)
+
+
+# Simula `sesiones` sesiones que piden los datos y los mantienen vivos (como el rerun de
+# cada sesión) y reporta por modo el tiempo por llamada y la memoria retenida por sesión
+def comparar_sesiones(sesiones=20, escala=1):
+    df = datos.leer_csv_residuos()
+    if escala > 1:
+        df = sinteticos.generar_residuos(df, datos.leer_csv_ubigeos(), escala)
+    reporte = {'filas': len(df), 'sesiones': sesiones, 'bytes_dataframe': int(df.memory_usage(deep=True).sum())}
+    for nombre, preparar in (('copia', _modo_copia), ('compartido', _modo_compartido)):
+        obtener = preparar(df)
+        vivas = []
+        tracemalloc.start()
+        try:
+            inicio = time.perf_counter()
+            for _ in range(sesiones):
+                vivas.append(obtener())
+            segundos = time.perf_counter() - inicio
+            retenidos, _pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        reporte[nombre] = {
+            'ms_por_llamada': segundos * 1000 / sesiones,
+            'bytes_por_sesion': retenidos / sesiones,
+        }
+        del vivas
+    return reporte
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Memoria por sesión: copia por llamada vs. datos compartidos")
+    parser.add_argument('--sesiones', type=int, default=20)
+    parser.add_argument('--escala', type=int, default=1, help="Multiplicador de filas del dataset sintético")
+    args = parser.parse_args()
+    json.dump(comparar_sesiones(args.sesiones, args.escala), sys.stdout, indent=2)
@@ -0,0 +1,91 @@
+# Versiones sintéticas de residuos_municipales.csv y TB_UBIGEOS.csv escaladas N veces:
+# más periodos (años después de 2021) y más distritos (copias de los reales con otro ubigeo)
+import os
+
+import numpy as np
+import pandas as pd
+
+# Los ubigeos sintéticos empiezan aquí para no chocar con los reales (departamentos 01-25)
+UBIGEO_SINTETICO = 300000
+
+
+# Reparte la escala entre periodos y distritos (lo más parejo posible): 10 -> 2 x 5,
+# 100 -> 10 x 10, 1000 -> 25 x 40
+def factores_escala(escala):
+    periodos = max(d for d in range(1, int(escala ** 0.5) + 1) if escala % d == 0)
+    return periodos, escala // periodos
+
+def _mapa_ubigeos(df, dful, copias_distritos):
+    claves = np.union1d(df['UBIGEO'].to_numpy(), dful['ubigeo_inei'].to_numpy())
+    if UBIGEO_SINTETICO + copias_distritos * len(claves) > 999999:
+        raise ValueError(f"Demasiadas copias de distritos ({copias_distritos}) para ubigeos de 6 dígitos")
+    return claves
+
+def _nuevo_ubigeo(ubigeos, copia, claves):
+    nuevo = UBIGEO_SINTETICO + copia * len(claves) + np.searchsorted(claves, ubigeos)
+    return np.where(copia == 0, ubigeos, nuevo)
+
+def _nombres_con_copia(valores, copia):
+    codigos, unicos = pd.factorize(valores)
+    nombres = np.array([f"{u} {j}" if j else str(u) for j in range(int(copia.max()) + 1) for u in unicos],
+                       dtype=object)
+    return nombres[codigos + copia * len(unicos)]
+
+
+# Genera el DataFrame de residuos escalado (mismo esquema que datos.leer_csv_residuos)
+def generar_residuos(df, dful, escala):
+    copias_periodos, copias_distritos = factores_escala(escala)
+    claves = _mapa_ubigeos(df, dful, copias_distritos)
+    n = len(df)
+    años = df['PERIODO'].nunique()
+    fila = np.tile(np.arange(n), escala)
+    copia_periodo = np.repeat(np.arange(copias_periodos), n * copias_distritos)
+    copia_distrito = np.tile(np.repeat(np.arange(copias_distritos), n), copias_periodos)
+    factor = 1 + 0.02 * copia_periodo + 0.01 * copia_distrito
+    nuevo = {}
+    for col in df.columns:
+        valores = df[col].to_numpy()[fila]
+        if col in ('QRESIDUOS_DOM', 'QRESIDUOS_NO_DOM', 'QRESIDUOS_MUN'):
+            valores = np.round(valores * factor, 2)
+        elif col in ('POB_TOTAL', 'POB_URBANA', 'POB_RURAL'):
+            valores = np.round(valores * factor).astype(np.int64)
+        elif col == 'PERIODO':
+            valores = valores + años * copia_periodo
+        elif col == 'UBIGEO':
+            valores = _nuevo_ubigeo(valores, copia_distrito, claves)
+        elif col == 'DISTRITO':
+            valores = _nombres_con_copia(valores, copia_distrito)
+        elif col == 'N_SEC':
+            valores = np.arange(1, len(fila) + 1)
+        nuevo[col] = valores
+    sintetico = pd.DataFrame(nuevo, index=df.index[fila])
+    sintetico.index.name = df.index.name
+    return sintetico
+
+# Genera TB_UBIGEOS escalado: cada distrito copiado con su nuevo ubigeo y coordenadas desplazadas
+def generar_ubigeos(df, dful, escala):
+    _copias_periodos, copias_distritos = factores_escala(escala)
+    claves = _mapa_ubigeos(df, dful, copias_distritos)
+    n = len(dful)
+    fila = np.tile(np.arange(n), copias_distritos)
+    copia = np.repeat(np.arange(copias_distritos), n)
+    sintetico = dful.iloc[fila].copy()
+    sintetico['ubigeo_inei'] = _nuevo_ubigeo(sintetico['ubigeo_inei'].to_numpy(), copia, claves)
+    sintetico['distrito'] = _nombres_con_copia(sintetico['distrito'].to_numpy(), copia)
+    sintetico['latitud'] = sintetico['latitud'] + 0.01 * copia
+    sintetico['longitud'] = sintetico['longitud'] + 0.01 * copia
+    sintetico.index = pd.RangeIndex(1, len(sintetico) + 1, name=dful.index.name)
+    return sintetico
+
+
+# Escribe ambos CSV en `carpeta` con el mismo formato que los originales
+# (latin1, separados por ';', ubigeos con ceros a la izquierda) y devuelve sus rutas
+def escribir_csv(df, dful, carpeta):
+    os.makedirs(carpeta, exist_ok=True)
+    ruta_residuos = os.path.join(carpeta, 'residuos_municipales.csv')
+    ruta_ubigeos = os.path.join(carpeta, 'TB_UBIGEOS.csv')
+    df = df.assign(UBIGEO=df['UBIGEO'].map('{:06d}'.format))
+    df.to_csv(ruta_residuos, sep=';', encoding='latin1')
+    dful = dful.assign(ubigeo_inei=dful['ubigeo_inei'].map('{:06d}'.format))
+    dful.to_csv(ruta_ubigeos, sep=';', encoding='latin1')
+    return ruta_residuos, ruta_ubigeos
@@ -0,0 +1,152 @@
+# Suite de benchmarks: mide por etapa las funciones que usa app.py (carga, agregación
+# de cada gráfico y construcción/serialización de las figuras) sobre datos sintéticos
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import agregados
+import datos
+import graficos
+from benchmarks import sinteticos
+from benchmarks.medicion import medir
+
+ESCALAS = [10, 100, 1000]
+
+
+# Etapas de un escenario. Cada etapa es (nombre, función, opciones de medir) y las
+# funciones leen del diccionario `estado` lo que dejaron las etapas anteriores
+def _etapas(estado, ruta_residuos, ruta_ubigeos, snapshot_dir):
+    def borrar_snapshots():
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    def chart4_filas():
+        indice = estado['indice']
+        departamento = indice['opciones'][0]
+        provincia = agregados.nodo_ubicacion(indice, departamento)['opciones'][0]
+        distrito = agregados.nodo_ubicacion(indice, departamento, provincia)['opciones'][0]
+        filas = agregados.nodo_ubicacion(indice, departamento, provincia, distrito)['filas']
+        distrito_filtrado = estado['distritos_geo'].iloc[filas]
+        return distrito_filtrado.assign(QRESIDUOS_MUN_SUM=distrito_filtrado['QRESIDUOS_MUN'].sum())
+
+    ultimo_periodo = lambda: int(estado['df']['PERIODO'].max())
+    return [
+        ('load_data.csv', lambda: datos.leer_csv_residuos(ruta_residuos), {}),
+        ('load_data.snapshot_escritura', lambda: datos.cargar_residuos(ruta_residuos, snapshot_dir),
+         {'preparar': borrar_snapshots}),
+        ('load_data.snapshot', lambda: datos.cargar_residuos(ruta_residuos, snapshot_dir), {}),
+        ('load_tb_ubigeos.csv', lambda: datos.leer_csv_ubigeos(ruta_ubigeos), {}),
+        ('load_tb_ubigeos.snapshot', lambda: datos.cargar_ubigeos(ruta_ubigeos, snapshot_dir), {}),
+        ('cubo.construccion', lambda: agregados.construir_cubo(estado['df']), {}),
+        ('chart1.groupby_directo', lambda: estado['df'].groupby('PERIODO')['QRESIDUOS_MUN'].sum().reset_index(), {}),
+        ('chart1.agregacion', lambda: agregados.consultar_cubo(estado['cubo'], ['PERIODO'], medidas=['QRESIDUOS_MUN']), {}),
+        ('chart2.groupby_directo', lambda: estado['df'].groupby('DEPARTAMENTO')['QRESIDUOS_MUN'].sum().reset_index(), {}),
+        ('chart2.agregacion', lambda: agregados.consultar_cubo(estado['cubo'], ['DEPARTAMENTO'], medidas=['QRESIDUOS_MUN']), {}),
+        ('chart3.groupby_directo', lambda: estado['df'][estado['df']['PERIODO'] == ultimo_periodo()]
+         .groupby('DEPARTAMENTO')['QRESIDUOS_MUN'].sum().reset_index(), {}),
+        ('chart3.agregacion', lambda: agregados.consultar_cubo(estado['cubo'], ['DEPARTAMENTO'], {'PERIODO': ultimo_periodo()},
+                                                              medidas=['QRESIDUOS_MUN']), {}),
+        ('chart4.indice', lambda: agregados.construir_indice_ubicaciones(estado['df']), {}),
+        ('chart4.enriquecimiento', lambda: datos.enriquecer_con_ubigeos(estado['df'], estado['dful'])[0], {}),
+        ('chart4.agregacion', chart4_filas, {}),
+        ('rankings.construccion', lambda: agregados.construir_indicadores(estado['cubo']), {}),
+        ('rankings.orden_completo', lambda: _ranking_orden_completo(estado['rankings.construccion'], ultimo_periodo()), {}),
+        ('rankings.top_k', lambda: agregados.ranking(dict(estado['rankings.construccion'], consultas=OrderedDict()),
+                                                      'Distrito', 'PER_CAPITA', ultimo_periodo(), 10), {}),
+        ('proyecciones.ajuste_por_unidad', lambda: _proyecciones_por_unidad(estado['rankings.construccion']), {}),
+        ('proyecciones.ajuste_por_lotes', lambda: agregados.construir_proyecciones(estado['rankings.construccion']), {}),
+        ('chart1.figura', lambda: graficos.figura_chart1(estado['chart1.agregacion']).to_json(), {}),
+        ('chart2.figura', lambda: graficos.figura_chart2(estado['chart2.agregacion']).to_json(), {}),
+        ('chart3.figura', lambda: graficos.figura_chart3(estado['chart3.agregacion'], ultimo_periodo()).to_json(), {}),
+        ('chart4.figura_mapa', lambda: graficos.figura_chart4_mapa(estado['chart4.agregacion']).to_json(), {}),
+        ('chart4.figura_barras', lambda: graficos.figura_chart4_barras(estado['chart4.agregacion']).to_json(), {}),
+    ]
+
+# Referencia para rankings.top_k: el mismo ranking ordenando todas las unidades con pandas
+def _ranking_orden_completo(indicadores, periodo, k=10):
+    datos_nivel = indicadores['niveles']['Distrito']
+    columna = datos_nivel['matrices']['PER_CAPITA'][:, indicadores['periodos'].index(periodo)]
+    return datos_nivel['unidades'].assign(PER_CAPITA=columna).dropna().sort_values('PER_CAPITA', ascending=False).head(k)
+
+# Referencia para proyecciones.ajuste_por_lotes: un np.polyfit por distrito y medida
+def _proyecciones_por_unidad(indicadores):
+    periodos = np.array(indicadores['periodos'])
+    coeficientes = {}
+    for medida in agregados.MEDIDAS_PROYECCION:
+        matriz = indicadores['niveles']['Distrito']['matrices'][medida]
+        for i in range(len(matriz)):
+            con_dato = ~np.isnan(matriz[i])
+            if con_dato.sum() >= agregados.MIN_PERIODOS_AJUSTE:
+                coeficientes[medida, i] = np.polyfit(periodos[con_dato] - periodos[0], matriz[i][con_dato], 1)
+    return coeficientes
+
+# Qué guarda cada etapa en `estado` para las siguientes
+_GUARDAR = {
+    'load_data.snapshot': 'df',
+    'load_tb_ubigeos.snapshot': 'dful',
+    'cubo.construccion': 'cubo',
+    'chart4.indice': 'indice',
+    'chart4.enriquecimiento': 'distritos_geo',
+}
+
+
+def _filas(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return len(valor)
+    return None
+
+# Corre todas las etapas para una escala y devuelve una lista de resultados (dicts)
+def correr_escala(escala, df_base, dful_base, carpeta, repeticiones=3, progreso=None):
+    inicio = time.perf_counter()
+    df = sinteticos.generar_residuos(df_base, dful_base, escala) if escala > 1 else df_base
+    dful = sinteticos.generar_ubigeos(df_base, dful_base, escala) if escala > 1 else dful_base
+    ruta_residuos, ruta_ubigeos = sinteticos.escribir_csv(df, dful, os.path.join(carpeta, f'x{escala}'))
+    generacion = time.perf_counter() - inicio
+    del df, dful
+    snapshot_dir = os.path.join(carpeta, f'x{escala}', '.snapshots')
+    estado = {}
+    resultados = []
+    for etapa, fn, opciones in _etapas(estado, ruta_residuos, ruta_ubigeos, snapshot_dir):
+        valor, medicion = medir(fn, repeticiones=repeticiones, **opciones)
+        estado[_GUARDAR.get(etapa, etapa)] = valor
+        resultado = {'escala': escala, 'etapa': etapa, **medicion, 'filas': _filas(valor)}
+        if isinstance(valor, str):
+            resultado['json_bytes'] = len(valor)
+        resultados.append(resultado)
+        if progreso is not None:
+            progreso(resultado)
+    resultados.append({'escala': escala, 'etapa': 'generacion_sintetica', 'segundos': generacion,
+                       'filas': len(estado['df']), 'csv_bytes': os.path.getsize(ruta_residuos)})
+    return resultados
+
+# Corre la suite completa y devuelve el reporte (listo para json.dump)
+def correr_suite(escalas=ESCALAS, repeticiones=3, carpeta=None, progreso=None):
+    df_base = datos.leer_csv_residuos()
+    dful_base = datos.leer_csv_ubigeos()
+    temporal = carpeta is None
+    carpeta = carpeta or tempfile.mkdtemp(prefix='bench_residuos_')
+    resultados = []
+    try:
+        for escala in escalas:
+            resultados.extend(correr_escala(escala, df_base, dful_base, carpeta, repeticiones, progreso))
+    finally:
+        if temporal:
+            shutil.rmtree(carpeta, ignore_errors=True)
+    return {
+        'meta': {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'plataforma': platform.platform(),
+            'escalas': list(escalas),
+            'repeticiones': repeticiones,
+        },
+        'resultados': resultados,
+    }
@@ -0,0 +1,413 @@
+# Capa de ingesta de datos: lectura de los CSV con snapshots columnares en disco
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Carpeta base del proyecto (los CSV viven junto a app.py)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESIDUOS_CSV = os.path.join(BASE_DIR, 'residuos_municipales.csv')
+UBIGEOS_CSV = os.path.join(BASE_DIR, 'TB_UBIGEOS.csv')
+# Carpeta donde se guardan los snapshots (una subcarpeta por archivo CSV)
+SNAPSHOT_DIR = os.path.join(BASE_DIR, '.snapshots')
+# Versión del formato; al cambiarla se invalidan todos los snapshots anteriores
+SNAPSHOT_VERSION = 4
+
+logger = logging.getLogger(__name__)
+
+
+# Normalizar el ubigeo a una clave entera de 6 dígitos (010101 -> 10101), la misma en
+# ambos CSV sin importar si el archivo trae o no los ceros a la izquierda
+def normalizar_ubigeo(serie):
+    claves = pd.to_numeric(serie.astype(str).str.strip(), errors='coerce')
+    invalidos = claves.isna() | (claves < 10101) | (claves > 999999)
+    if invalidos.any():
+        raise ValueError(f"UBIGEO inválidos: {serie[invalidos].unique()[:10].tolist()}")
+    return claves.astype(np.int32)
+
+
+# Esquema compacto de residuos: la geografía como categorías (ordenadas alfabéticamente,
+# así los groupby devuelven el mismo orden que con textos), los enteros en el tipo más
+# chico que conserva sus valores, y sin N_SEC ni el índice FECHA_CORTE (no se usan).
+# Los decimales quedan en float64: en float32 0.48 se muestra como 0.4799999893.
+COLUMNAS_CATEGORICAS = ['REG_NAT', 'DEPARTAMENTO', 'PROVINCIA', 'DISTRITO']
+COLUMNAS_DESCARTADAS = ['N_SEC']
+
+def _entero_compacto(valores):
+    for tipo in (np.int16, np.int32):
+        info = np.iinfo(tipo)
+        if len(valores) == 0 or (valores.min() >= info.min and valores.max() <= info.max):
+            return valores.astype(tipo, copy=False)
+    return valores
+
+# Las particiones escritas antes guardaban GPC_DOM en float32, solo si conservaba los
+# valores a 4 decimales: redondear a 4 decimales recupera el float64 del CSV
+def _decimal(valores):
+    if valores.dtype == np.float32:
+        return np.round(valores.astype(np.float64), 4)
+    return valores
+
+def compactar_residuos(df):
+    df = df.drop(columns=[c for c in COLUMNAS_DESCARTADAS if c in df.columns]).reset_index(drop=True)
+    columnas = {}
+    for col in df.columns:
+        serie = df[col]
+        if col in COLUMNAS_CATEGORICAS:
+            columnas[col] = serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype('category')
+        elif pd.api.types.is_integer_dtype(serie.dtype) and isinstance(serie.dtype, np.dtype):
+            columnas[col] = _entero_compacto(serie.to_numpy())
+        elif pd.api.types.is_float_dtype(serie.dtype) and isinstance(serie.dtype, np.dtype):
+            columnas[col] = _decimal(serie.to_numpy())
+        else:
+            columnas[col] = serie
+    return pd.DataFrame(columnas)
+
+# Memoria por columna (bytes reales, contando textos y categorías) y su tipo
+def reporte_memoria(df):
+    memoria = df.memory_usage(deep=True)
+    filas = [{'columna': str(col), 'tipo': str(df[col].dtype) if col in df.columns else str(df.index.dtype),
+              'bytes': int(bytes_)} for col, bytes_ in memoria.items()]
+    filas.append({'columna': 'TOTAL', 'tipo': '', 'bytes': int(memoria.sum())})
+    return pd.DataFrame(filas)
+
+
+# Lectores directos de los CSV (la ruta lenta, usada para construir el snapshot)
+def leer_csv_residuos(file_path=RESIDUOS_CSV):
+    df = pd.read_csv(file_path, encoding="latin1", delimiter=";", index_col=0, dtype={'UBIGEO': str})
+    df["UBIGEO"] = normalizar_ubigeo(df["UBIGEO"])
+    df["PERIODO"] = df["PERIODO"].astype(int)
+    return compactar_residuos(df)
+
+def leer_csv_ubigeos(file_path=UBIGEOS_CSV):
+    dful = pd.read_csv(file_path, encoding="latin1", delimiter=";", index_col=0, dtype={'ubigeo_inei': str})
+    dful["ubigeo_inei"] = normalizar_ubigeo(dful["ubigeo_inei"])
+    return dful
+
+
+# Huella del archivo fuente: mtime y tamaño para la comprobación rápida, sha1 para confirmar
+def _hash_archivo(file_path):
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+def huella_archivo(file_path, con_hash=True):
+    info = os.stat(file_path)
+    huella = {'mtime_ns': info.st_mtime_ns, 'size': info.st_size}
+    if con_hash:
+        huella['sha1'] = _hash_archivo(file_path)
+    return huella
+
+
+# Versión de los datos: cambia cuando cambia cualquiera de los CSV fuente. Se usa como
+# clave de caché para todo lo que se deriva de los datos (cubo, índices, figuras...)
+def version_datos(*file_paths):
+    partes = []
+    for file_path in file_paths or (RESIDUOS_CSV, UBIGEOS_CSV):
+        huella = huella_archivo(file_path, con_hash=False)
+        partes.append(f"{os.path.basename(file_path)}:{huella['mtime_ns']}:{huella['size']}")
+    return hashlib.sha1('|'.join(partes).encode()).hexdigest()[:16]
+
+
+# Cada snapshot publicado vive en su propia carpeta (`<nombre>.v-<id>`) y el archivo
+# `<nombre>.actual` dice cuál es la vigente; publicar es reemplazar ese archivo con
+# os.replace, así un lector ve siempre un snapshot completo. Los snapshots escritos
+# antes de este esquema están en la carpeta `<nombre>`.
+PUNTERO = '.actual'
+# Las carpetas reemplazadas se borran pasado este tiempo (un lector puede estar usándolas)
+GRACIA_SNAPSHOTS_S = 600
+
+def _carpeta_snapshot(nombre, snapshot_dir=None):
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    try:
+        with open(os.path.join(snapshot_dir, nombre + PUNTERO), encoding='utf-8') as f:
+            return os.path.join(snapshot_dir, f.read().strip())
+    except FileNotFoundError:
+        return os.path.join(snapshot_dir, nombre)
+
+def existe_snapshot(nombre, snapshot_dir=None):
+    return os.path.isdir(_carpeta_snapshot(nombre, snapshot_dir))
+
+# Borra el snapshot y todas sus carpetas (la vigente y las reemplazadas)
+def eliminar_snapshot(nombre, snapshot_dir=None):
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    try:
+        os.remove(os.path.join(snapshot_dir, nombre + PUNTERO))
+    except FileNotFoundError:
+        pass
+    for carpeta in _carpetas_publicadas(nombre, snapshot_dir) + [nombre]:
+        shutil.rmtree(os.path.join(snapshot_dir, carpeta), ignore_errors=True)
+
+def _carpetas_publicadas(nombre, snapshot_dir):
+    if not os.path.isdir(snapshot_dir):
+        return []
+    return [c for c in os.listdir(snapshot_dir) if c.startswith(nombre + '.v-')]
+
+# Con `exigir_version=False` también se aceptan snapshots de versiones anteriores (el
+# lector entiende todos los formatos; la versión sirve para invalidar las cachés de CSV)
+# La meta recuerda de qué carpeta se leyó (`carpeta`), para leer las columnas de esa
+# misma carpeta aunque entretanto se publique otro snapshot.
+def _leer_meta(nombre, snapshot_dir=None, exigir_version=True):
+    carpeta = _carpeta_snapshot(nombre, snapshot_dir)
+    ruta = os.path.join(carpeta, 'meta.json')
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding='utf-8') as f:
+        meta = json.load(f)
+    meta['carpeta'] = os.path.basename(carpeta)
+    if exigir_version and meta.get('version') != SNAPSHOT_VERSION:
+        return None
+    return meta
+
+# El snapshot es válido si el CSV no cambió: mismo mtime y tamaño, o (si solo cambió
+# el mtime, p. ej. tras un checkout) el mismo contenido según su sha1
+def _snapshot_vigente(meta, file_path, snapshot_dir=None):
+    actual = huella_archivo(file_path, con_hash=False)
+    origen = meta['origen']
+    if actual['size'] != origen['size']:
+        return False
+    if actual['mtime_ns'] == origen['mtime_ns']:
+        return True
+    if _hash_archivo(file_path) != origen['sha1']:
+        return False
+    # Mismo contenido: se actualiza el mtime para que la próxima vez baste con stat()
+    meta['origen']['mtime_ns'] = actual['mtime_ns']
+    try:
+        carpeta = os.path.join(snapshot_dir or SNAPSHOT_DIR, meta['carpeta'])
+        _escribir_json(os.path.join(carpeta, 'meta.json'), {k: v for k, v in meta.items() if k != 'carpeta'})
+    except OSError:
+        pass
+    return True
+
+# Escritura atómica; el temporal tiene nombre único para que dos escritores no choquen
+def _escribir_json(ruta, contenido):
+    _escribir_atomico(ruta, json.dumps(contenido))
+
+def _escribir_atomico(ruta, texto):
+    descriptor, tmp = tempfile.mkstemp(prefix=os.path.basename(ruta) + '.', suffix='.tmp', dir=os.path.dirname(ruta))
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+            f.write(texto)
+        os.replace(tmp, ruta)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+# El snapshot vigente ya tiene este contenido: mismo formato y mismo CSV de origen (sha1)
+# o misma `huella` de contenido
+def _mismo_snapshot(nombre, snapshot_dir, origen, huella):
+    meta = _leer_meta(nombre, snapshot_dir)
+    if meta is None:
+        return None
+    if origen is not None and (meta.get('origen') or {}).get('sha1') == origen['sha1']:
+        return meta
+    if huella is not None and meta.get('huella') == huella:
+        return meta
+    return None
+
+
+# Guardar el DataFrame como un .npy por columna: los números tal cual y los textos
+# como códigos enteros más la lista de categorías. `file_path` es el CSV de origen
+# (para validar el snapshot después); puede ser None si el DataFrame no viene de un archivo,
+# y entonces `huella` (opcional) identifica su contenido.
+# Las columnas se escriben en una carpeta propia y se publican cambiando `<nombre>.actual`.
+# Si otro escritor ya publicó el mismo contenido, se devuelve su meta sin publicar nada.
+def guardar_snapshot(df, nombre, file_path, snapshot_dir=None, huella=None):
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    os.makedirs(snapshot_dir, exist_ok=True)
+    origen = huella_archivo(file_path) if file_path else None
+    existente = _mismo_snapshot(nombre, snapshot_dir, origen, huella)
+    if existente is not None:
+        return existente
+    tmp = tempfile.mkdtemp(prefix=nombre + '.v-', dir=snapshot_dir)
+    try:
+        marco = df.reset_index()
+        columnas = []
+        for i, col in enumerate(marco.columns):
+            serie = marco[col]
+            archivo = f'{i}.npy'
+            if pd.api.types.is_numeric_dtype(serie) and isinstance(serie.dtype, np.dtype):
+                np.save(os.path.join(tmp, archivo), serie.to_numpy())
+                columnas.append({'nombre': col, 'archivo': archivo, 'tipo': 'numero'})
+            elif isinstance(serie.dtype, pd.CategoricalDtype):
+                np.save(os.path.join(tmp, archivo), serie.cat.codes.to_numpy().astype(np.int32))
+                columnas.append({'nombre': col, 'archivo': archivo, 'tipo': 'texto', 'categorica': True,
+                                 'categorias': [str(c) for c in serie.cat.categories]})
+            else:
+                codigos, categorias = pd.factorize(serie)
+                np.save(os.path.join(tmp, archivo), codigos.astype(np.int32))
+                columnas.append({'nombre': col, 'archivo': archivo, 'tipo': 'texto',
+                                 'categorias': [str(c) for c in categorias]})
+        meta = {
+            'version': SNAPSHOT_VERSION,
+            'nombre': nombre,
+            'origen': origen,
+            'huella': huella,
+            'indice': df.index.name,
+            'filas': len(df),
+            'columnas': columnas,
+        }
+        _escribir_json(os.path.join(tmp, 'meta.json'), meta)
+        # Otro escritor pudo terminar el mismo snapshot mientras tanto: se usa el suyo
+        existente = _mismo_snapshot(nombre, snapshot_dir, origen, huella)
+        if existente is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return existente
+        anterior = os.path.basename(_carpeta_snapshot(nombre, snapshot_dir))
+        _escribir_atomico(os.path.join(snapshot_dir, nombre + PUNTERO), os.path.basename(tmp))
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    meta['carpeta'] = os.path.basename(tmp)
+    _limpiar_snapshots(nombre, snapshot_dir, conservar={meta['carpeta'], anterior})
+    return meta
+
+# Borra las carpetas reemplazadas hace más de GRACIA_SNAPSHOTS_S (y la del esquema anterior)
+def _limpiar_snapshots(nombre, snapshot_dir, conservar):
+    limite = time.time() - GRACIA_SNAPSHOTS_S
+    for carpeta in _carpetas_publicadas(nombre, snapshot_dir) + [nombre]:
+        ruta = os.path.join(snapshot_dir, carpeta)
+        try:
+            if carpeta not in conservar and os.path.getmtime(ruta) < limite:
+                shutil.rmtree(ruta, ignore_errors=True)
+        except OSError:
+            pass
+
+# Con `mmap=True` las columnas numéricas quedan mapeadas en memoria (solo lectura) en vez
+# de copiarse: varios procesos que lean el mismo snapshot comparten esas páginas
+def leer_snapshot(nombre, meta=None, snapshot_dir=None, mmap=False):
+    if meta is None:
+        meta = _leer_meta(nombre, snapshot_dir, exigir_version=False)
+    carpeta = os.path.join(snapshot_dir or SNAPSHOT_DIR, meta['carpeta'])
+    datos = {}
+    for col in meta['columnas']:
+        modo = 'r' if mmap and col['tipo'] == 'numero' else None
+        valores = np.load(os.path.join(carpeta, col['archivo']), mmap_mode=modo, allow_pickle=False)
+        if col.get('categorica'):
+            valores = pd.Categorical.from_codes(valores, categories=col['categorias'])
+        elif col['tipo'] == 'texto':
+            # El código -1 (valor faltante) toma el último elemento, que es NaN
+            tabla = np.empty(len(col['categorias']) + 1, dtype=object)
+            tabla[:-1] = col['categorias']
+            tabla[-1] = np.nan
+            valores = tabla[valores]
+        datos[col['nombre']] = valores
+    df = pd.DataFrame(datos, copy=False)
+    df = df.set_index(df.columns[0])
+    df.index.name = meta['indice']
+    return df
+
+
+# Carga con snapshot: si hay uno vigente se lee, si no se parsea el CSV y se guarda.
+# Cualquier problema con el snapshot (carpeta sin permisos, archivo corrupto) cae al CSV.
+def cargar_con_snapshot(file_path, nombre, lector, snapshot_dir=None, mmap=False):
+    try:
+        meta = _leer_meta(nombre, snapshot_dir)
+        if meta is not None and _snapshot_vigente(meta, file_path, snapshot_dir):
+            return leer_snapshot(nombre, meta, snapshot_dir, mmap)
+    except (OSError, ValueError, KeyError):
+        pass
+    df = lector(file_path)
+    # Sin permisos de escritura (o disco lleno) se sigue sin snapshot
+    try:
+        guardar_snapshot(df, nombre, file_path, snapshot_dir)
+    except OSError:
+        pass
+    return df
+
+def cargar_residuos(file_path=RESIDUOS_CSV, snapshot_dir=None, mmap=False):
+    return cargar_con_snapshot(file_path, 'residuos_municipales', leer_csv_residuos, snapshot_dir, mmap)
+
+def cargar_ubigeos(file_path=UBIGEOS_CSV, snapshot_dir=None, mmap=False):
+    return cargar_con_snapshot(file_path, 'tb_ubigeos', leer_csv_ubigeos, snapshot_dir, mmap)
+
+
+# Versión de solo lectura de un DataFrame para compartirlo entre sesiones, sin copiar datos:
+# cada columna NumPy (y el índice) pasa a ser una vista no escribible del mismo arreglo.
+# Escribir en esos arreglos (df[col].to_numpy()[i] = ..., df[col].values[i] = ...) falla
+# con un error; con copy-on-write, df.loc[...] = ... sobre una vista no falla, sino que
+# copia la columna para ese DataFrame y la copia compartida no cambia.
+# El DataFrame original no debe seguir modificándose después.
+def solo_lectura(df):
+    columnas = {}
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, np.dtype):
+            valores = serie.to_numpy().view()
+            valores.flags.writeable = False
+            columnas[col] = valores
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos = serie.cat.codes.to_numpy().view()
+            codigos.flags.writeable = False
+            columnas[col] = pd.Categorical.from_codes(codigos, dtype=serie.dtype, validate=False)
+        else:
+            columnas[col] = serie.array
+    indice = df.index
+    if isinstance(indice.dtype, np.dtype) and not isinstance(indice, pd.RangeIndex):
+        valores = indice.to_numpy().view()
+        valores.flags.writeable = False
+        indice = pd.Index(valores, name=indice.name, copy=False)
+    return pd.DataFrame(columnas, index=indice, copy=False)
+
+
+# Columnas de TB_UBIGEOS que se agregan a cada fila de residuos
+COLUMNAS_GEO = ['latitud', 'longitud', 'altitud', 'superficie', 'macroregion_inei']
+
+# Tabla de distritos enriquecida: un solo join vectorizado por la clave UBIGEO.
+# Devuelve la tabla (mismo orden de filas que `df`) y los ubigeos sin coordenadas,
+# que se informan una vez aquí en lugar de aparecer vacíos al mostrar el mapa.
+def enriquecer_con_ubigeos(df, dful):
+    geo = dful.drop_duplicates('ubigeo_inei').set_index('ubigeo_inei')[COLUMNAS_GEO]
+    enriquecido = df.join(geo, on='UBIGEO')
+    sin_match = enriquecido['latitud'].isna()
+    faltantes = sorted(enriquecido.loc[sin_match, 'UBIGEO'].unique().tolist())
+    if faltantes:
+        logger.warning("%d ubigeos de residuos sin coordenadas en TB_UBIGEOS: %s%s", len(faltantes),
+                       faltantes[:20], ' ...' if len(faltantes) > 20 else '')
+    return enriquecido, faltantes
+
+
+# Comparación de tiempos de carga CSV vs. snapshot (mejor de varias repeticiones)
+def comparar_tiempos_carga(repeticiones=5):
+    casos = [
+        ('residuos_municipales.csv', RESIDUOS_CSV, leer_csv_residuos, cargar_residuos),
+        ('TB_UBIGEOS.csv', UBIGEOS_CSV, leer_csv_ubigeos, cargar_ubigeos),
+    ]
+    filas = []
+    for nombre, file_path, lector_csv, lector_snapshot in casos:
+        lector_snapshot(file_path)  # asegura que el snapshot exista
+        tiempos = {}
+        for etiqueta, lector in (('csv_s', lector_csv), ('snapshot_s', lector_snapshot)):
+            mejor = float('inf')
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                lector(file_path)
+                mejor = min(mejor, time.perf_counter() - inicio)
+            tiempos[etiqueta] = mejor
+        filas.append({'archivo': nombre, **tiempos,
+                      'aceleracion': tiempos['csv_s'] / tiempos['snapshot_s']})
+    return pd.DataFrame(filas)
+
+
+# Uso:  python datos.py            (tiempos de carga CSV vs. snapshot)
+#       python datos.py memoria    (memoria por columna: esquema del CSV vs. compacto)
+if __name__ == '__main__':
+    import sys
+    if sys.argv[1:] == ['memoria']:
+        original = pd.read_csv(RESIDUOS_CSV, encoding="latin1", delimiter=";", index_col=0)
+        compacto = cargar_residuos()
+        reporte = reporte_memoria(original).merge(reporte_memoria(compacto), on='columna', how='left',
+                                                  suffixes=('_csv', '_compacto'))
+        print(reporte.to_string(index=False))
+    else:
+        print(comparar_tiempos_carga().to_string(index=False))
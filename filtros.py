@@ -0,0 +1,118 @@
+# Motor de filtros del explorador (prueba.py): etiquetas de ubicación y códigos
+# categóricos precalculados, filtros combinados en una sola máscara y catálogo de
+# opciones memorizado
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+COLUMNA_REGION = 'REGION NATURAL'
+COLUMNAS_UBICACION = ['DEPARTAMENTO', 'PROVINCIA', 'DISTRITO']
+SEPARADOR_UBICACION = ' / '
+# Máximo de combinaciones (rango, región) que se recuerdan en el catálogo de opciones
+MAX_CATALOGO = 256
+# Máximo de conteos e histogramas (por filtro, columna y bins) que se recuerdan
+MAX_RESUMENES = 256
+
+
+# Precalcula lo que los filtros necesitan: códigos enteros de región y de ubicación
+# (DEPARTAMENTO / PROVINCIA / DISTRITO) en orden de aparición, y la etiqueta de texto
+# de cada ubicación distinta (unas 1.9k, no una por fila)
+def construir_motor(df):
+    df = df.reset_index(drop=True)
+    region_codigos, regiones = pd.factorize(df[COLUMNA_REGION])
+    ubicacion_codigos, ubicaciones = pd.MultiIndex.from_frame(df[COLUMNAS_UBICACION]).factorize()
+    etiquetas = [SEPARADOR_UBICACION.join(map(str, u)) for u in ubicaciones]
+    return {
+        'df': df,
+        'region_codigos': region_codigos,
+        'regiones': [str(r) for r in regiones],
+        'ubicacion_codigos': ubicacion_codigos,
+        'ubicaciones': etiquetas,
+        'ubicacion_posicion': {etiqueta: i for i, etiqueta in enumerate(etiquetas)},
+        'catalogo': OrderedDict(),
+        'resumenes': OrderedDict(),
+        'lock': threading.Lock(),
+    }
+
+
+# Máscara booleana de todos los filtros combinados. `rango` es (inicio, fin) por posición
+# de fila (ambos incluidos, como el slider); `region` y `ubicacion` son valores de las
+# listas del motor, o None para no filtrar.
+def mascara(motor, rango=None, region=None, ubicacion=None):
+    n = len(motor['df'])
+    resultado = np.ones(n, dtype=bool)
+    if rango is not None:
+        inicio, fin = rango
+        resultado[:max(inicio, 0)] = False
+        resultado[fin + 1:] = False
+    if region is not None:
+        codigo = motor['regiones'].index(region) if region in motor['regiones'] else -2
+        resultado &= motor['region_codigos'] == codigo
+    if ubicacion is not None:
+        codigo = motor['ubicacion_posicion'].get(ubicacion, -2)
+        resultado &= motor['ubicacion_codigos'] == codigo
+    return resultado
+
+# Filas que cumplen la máscara (una sola selección sobre el DataFrame)
+def aplicar(motor, mascara_filas):
+    if mascara_filas.all():
+        return motor['df']
+    return motor['df'][mascara_filas]
+
+
+# Opciones disponibles para los selectbox según los filtros anteriores, memorizadas
+# por (rango, región): regiones presentes en el rango y ubicaciones presentes tras
+# aplicar rango y región, en orden de aparición
+def opciones(motor, rango=None, region=None):
+    clave = (rango, region)
+    with motor['lock']:
+        if clave in motor['catalogo']:
+            motor['catalogo'].move_to_end(clave)
+            return motor['catalogo'][clave]
+    filas_rango = mascara(motor, rango)
+    regiones = _presentes(motor['region_codigos'][filas_rango], motor['regiones'])
+    filas = filas_rango if region is None else mascara(motor, rango, region)
+    ubicaciones = _presentes(motor['ubicacion_codigos'][filas], motor['ubicaciones'])
+    resultado = {'regiones': regiones, 'ubicaciones': ubicaciones}
+    with motor['lock']:
+        motor['catalogo'][clave] = resultado
+        while len(motor['catalogo']) > MAX_CATALOGO:
+            motor['catalogo'].popitem(last=False)
+    return resultado
+
+def _presentes(codigos, valores):
+    codigos = codigos[codigos >= 0]
+    presentes = np.flatnonzero(np.bincount(codigos, minlength=len(valores)))
+    return [valores[i] for i in presentes]
+
+
+# Resúmenes para los gráficos: se calculan una vez por (filtro, columna[, bins]) y el
+# gráfico se arma solo con ellos, así su tamaño no depende de las filas filtradas
+def _resumen(motor, clave, calcular):
+    with motor['lock']:
+        if clave in motor['resumenes']:
+            motor['resumenes'].move_to_end(clave)
+            return motor['resumenes'][clave]
+    resultado = calcular()
+    with motor['lock']:
+        motor['resumenes'][clave] = resultado
+        while len(motor['resumenes']) > MAX_RESUMENES:
+            motor['resumenes'].popitem(last=False)
+    return resultado
+
+# Frecuencia de cada valor de `columna` en `df` (ya filtrado según `clave_filtro`)
+def conteos(motor, clave_filtro, df, columna):
+    return _resumen(motor, ('conteos', clave_filtro, columna), lambda: df[columna].value_counts())
+
+# Resumen estadístico (describe) de `df` (ya filtrado según `clave_filtro`)
+def resumen_estadistico(motor, clave_filtro, df):
+    return _resumen(motor, ('describe', clave_filtro), df.describe)
+
+# Conteos y bordes de `bins` intervalos iguales de `columna` (sin nulos), con np.histogram
+def histograma(motor, clave_filtro, df, columna, bins=20):
+    def calcular():
+        valores = pd.to_numeric(df[columna], errors='coerce').to_numpy(dtype=float)
+        return np.histogram(valores[~np.isnan(valores)], bins=bins)
+    return _resumen(motor, ('histograma', clave_filtro, columna, bins), calcular)
@@ -0,0 +1,326 @@
+# Construcción de las figuras Plotly de los gráficos y caché de figuras ya serializadas.
+# Plotly se importa dentro de cada función: importar este módulo no lo carga, así las
+# páginas sin gráficos (Acerca, Nosotros) no pagan su tiempo de importación.
+import threading
+from collections import OrderedDict
+
+
+# Gráfico 1: donut de residuos municipales por PERIODO
+def figura_chart1(sum_by_periodo):
+    import plotly.express as px
+    import plotly.graph_objects as go
+    # Crear un gráfico de pastel (donut chart) utilizando plotly
+    pull_values = [0.1] + [0] * (len(sum_by_periodo) - 1)
+    fig = go.Figure()
+    # Resaltar el primer periodo (2014)
+    fig.add_trace(go.Pie(
+        labels=sum_by_periodo["PERIODO"],
+        values=sum_by_periodo["QRESIDUOS_MUN"],
+        texttemplate="%{label}<br>%{percent:.2%}",
+        hole=0.4,
+        showlegend=True,
+        hovertemplate="<b>Año</b>: %{label}<br>"
+                    "<b>Total</b>: %{value:.2f} Ton/Año<br>"
+                    "<b>Porcentaje</b>: %{percent:.2%}<br>"
+                    "<extra></extra>",
+        textinfo='percent+value',
+        # pull=[0.1] * len(sum_by_periodo),
+        pull=pull_values,
+        marker=dict(colors=px.colors.qualitative.Set3),
+        sort=False  # Desactivar el ordenamiento automático
+    ))
+    # Use `hole` to create a donut-like pie chart
+    fig.update_traces(hole=.4, hoverinfo="label+percent")
+    # Anotación central
+    fig.add_annotation(
+        text="RR.SS",
+        x=0.5,
+        y=0.5,
+        showarrow=False,
+        font=dict(size=20)
+    )
+
+    fig.update_layout(
+        title="Residuos municipales Ton/Año | 2014 - 2021",
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        font=dict(family="Arial", size=12, color="black"),
+    )
+    return fig
+
+# Gráfico 2: burbujas de residuos municipales por DEPARTAMENTO
+def figura_chart2(sum_residuos_urbanos):
+    import plotly.express as px
+    sum_residuos_urbanos = sum_residuos_urbanos.rename(columns={"QRESIDUOS_MUN": "Residuos Municipales"})
+    fig = px.scatter(sum_residuos_urbanos, x="DEPARTAMENTO", y="Residuos Municipales",
+                    size="Residuos Municipales", color="DEPARTAMENTO",
+                    hover_name="DEPARTAMENTO", title="Residuos Municipales Ton/Año por Departamento",
+                    labels={"Residuos Domiciliarios": "Residuos Municipales", "DEPARTAMENTO": "Departamento"},
+                    size_max=60,
+                    color_discrete_sequence=px.colors.qualitative.Set3)
+    fig.update_yaxes(title_text="Residuos Municipales 2014 - 2021")
+    fig.update_layout(xaxis_tickangle=-45)
+    fig.update_layout(
+        xaxis=dict(title='Departamento'),
+        yaxis=dict(title='Residuos Municipales 2014 - 2021'),
+        template="plotly_dark",
+        font=dict(family="Arial", size=12, color="white"),
+    )
+    return fig
+
+# Gráfico 3: línea de residuos por DEPARTAMENTO para un PERIODO
+def figura_chart3(df_grouped, selected_periodo):
+    import plotly.express as px
+    # Plot with Plotly
+    fig = px.line(df_grouped, x='DEPARTAMENTO', y='QRESIDUOS_MUN', title='Residuos por departamento ')
+
+    # Add circular markers and customize the style
+    fig.update_traces(
+        mode='lines+markers',
+        marker=dict(symbol='circle', size=10, color='red'),
+        line=dict(color='blue', width=2)
+    )
+
+    # Update layout for advanced styling
+    fig.update_layout(
+        title=dict(
+            text='Residuos por departamento - '+str(selected_periodo),
+            font=dict(size=20, color='darkblue'),
+            # x=0.5  # Center the title
+        ),
+        xaxis=dict(
+            title='Departamento',
+            titlefont=dict(size=16, color='darkblue'),
+            tickfont=dict(size=14, color='black'),
+            showgrid=True,
+            gridcolor='lightgrey'
+        ),
+        yaxis=dict(
+            title='Cantidad de Residuos',
+            titlefont=dict(size=16, color='darkblue'),
+            tickfont=dict(size=14, color='black'),
+            showgrid=True,
+            gridcolor='lightgrey'
+        ),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        hovermode='x unified'
+    )
+    return fig
+
+# Gráfico 4 (mapa): ubicación del distrito con el total de residuos del periodo
+def figura_chart4_mapa(distrito_filtrado):
+    import plotly.express as px
+    fig = px.scatter_mapbox(
+        distrito_filtrado,
+        hover_name="DISTRITO",
+        hover_data=["DEPARTAMENTO", "PROVINCIA", "QRESIDUOS_MUN_SUM"],
+        title="Total de Residuos por Distrito del 2014 al 2021",
+        lat="latitud",
+        lon="longitud",
+        zoom=11,
+        height=400,
+        color="QRESIDUOS_MUN_SUM",
+        size="QRESIDUOS_MUN_SUM",
+        # color_continuous_scale="Viridis",  # Cute color scale
+        # opacity=0.7,  # Cute opacity level
+        labels={"QRESIDUOS_MUN_SUM": "Total Residuos "},
+        center={"lat": distrito_filtrado["latitud"].mean(), "lon": distrito_filtrado["longitud"].mean()},
+    )
+    # Customize map layout
+    fig.update_layout(mapbox_style="open-street-map")
+    return fig
+
+# Gráfico 4 (barras): residuos domiciliarios y no domiciliarios del distrito por PERIODO
+def figura_chart4_barras(distrito_filtrado):
+    import plotly.express as px
+    fig = px.bar(
+    distrito_filtrado,
+    x='PERIODO',
+    y=['QRESIDUOS_DOM', 'QRESIDUOS_NO_DOM'],
+    barmode='group',
+    title='QRESIDUOS_DOM y QRESIDUOS_NO_DOM por PERIODO',
+    color_discrete_map={'QRESIDUOS_DOM': 'green', 'QRESIDUOS_NO_DOM': 'gray'}
+    )
+    # Customize hover template
+    fig.update_traces(
+        hovertemplate='<b style="color:red;">Periodo</b>: %{x}<br><b style="color:blue;">Cantidad</b>: %{y:.2f} <b style="color:black;">Ton/Año</b>'
+    )
+
+    fig.update_layout(
+    xaxis_title='Periodo',
+    yaxis_title='Cantidad',
+    yaxis_tickformat=',.2f',  # Format y-axis ticks as whole numbers
+    font=dict(size=10),  # Set font size
+    plot_bgcolor='rgba(0,0,0,0)', # Transparent background
+    legend_title_text='TIPO DE RESIDUOS'
+)
+    return fig
+
+# Mapa nacional: una marca por celda de la grilla (centroide de sus distritos), con
+# color según la medida elegida y tamaño según los residuos de la celda
+def figura_mapa_nacional(celdas, medida, etiqueta, selected_periodo, zoom):
+    import plotly.express as px
+    fig = px.scatter_mapbox(
+        celdas,
+        lat="latitud",
+        lon="longitud",
+        color=medida,
+        size="QRESIDUOS_MUN",
+        size_max=30,
+        hover_data={"DISTRITOS": True, "QRESIDUOS_MUN": ':,.2f', "POB_TOTAL": ':,', "PER_CAPITA": ':.1f',
+                    "latitud": False, "longitud": False},
+        labels={medida: etiqueta, "DISTRITOS": "Distritos", "QRESIDUOS_MUN": "Residuos (Ton/Año)",
+                "POB_TOTAL": "Población", "PER_CAPITA": "Per cápita (kg/hab/año)"},
+        color_continuous_scale="YlOrRd",
+        title=f"{etiqueta} - {selected_periodo}",
+        zoom=zoom,
+        height=600,
+        center={"lat": -9.19, "lon": -75.02},
+    )
+    fig.update_layout(mapbox_style="open-street-map", margin=dict(l=0, r=0, t=40, b=0))
+    return fig
+
+# Rankings: barras horizontales con las unidades del ranking (la primera arriba)
+def figura_ranking(tabla, indicador, etiqueta, titulo):
+    import plotly.express as px
+    nombres = tabla.drop(columns=['PUESTO', indicador]).astype(str).agg(' / '.join, axis=1)
+    fig = px.bar(
+        x=tabla[indicador],
+        y=nombres,
+        orientation='h',
+        title=titulo,
+        labels={'x': etiqueta, 'y': ''},
+        color=tabla[indicador],
+        color_continuous_scale='YlOrRd',
+    )
+    fig.update_layout(yaxis=dict(autorange='reversed'), coloraxis_showscale=False,
+                      height=max(300, 28 * len(tabla) + 120))
+    return fig
+
+# Comparación de unidades: una línea por unidad, superpuestas en un mismo gráfico o
+# en pequeños múltiplos (un panel por unidad, con el mismo eje Y)
+def figura_comparacion(series, medida, etiqueta, multiples=False):
+    import plotly.express as px
+    opciones = dict(facet_col='UNIDAD', facet_col_wrap=3, facet_row_spacing=0.08) if multiples else {}
+    filas = (series['UNIDAD'].nunique() + 2) // 3 if multiples else 1
+    fig = px.line(
+        series,
+        x='PERIODO',
+        y=medida,
+        color='UNIDAD',
+        markers=True,
+        labels={medida: etiqueta, 'UNIDAD': 'Unidad', 'PERIODO': 'Periodo'},
+        title=f'{etiqueta} por PERIODO',
+        color_discrete_sequence=px.colors.qualitative.Set2,
+        height=max(450, 260 * filas),
+        **opciones,
+    )
+    if multiples:
+        fig.for_each_annotation(lambda a: a.update(text=a.text.split('=', 1)[-1]))
+        fig.update_layout(showlegend=False)
+    return fig
+
+# Proyección de una unidad: la serie observada, la recta de tendencia (continua en los
+# periodos observados y punteada en los proyectados) y la banda de ±2 desvíos
+def figura_proyeccion(tabla, etiqueta, titulo):
+    import plotly.graph_objects as go
+    proyectado = tabla[tabla['PROYECTADO'] | tabla['PROYECTADO'].shift(-1, fill_value=False)]
+    fig = go.Figure([
+        go.Scatter(x=tabla['PERIODO'], y=tabla['SUPERIOR'], mode='lines', line=dict(width=0),
+                   showlegend=False, hoverinfo='skip'),
+        go.Scatter(x=tabla['PERIODO'], y=tabla['INFERIOR'], mode='lines', line=dict(width=0), fill='tonexty',
+                   fillcolor='rgba(255, 75, 75, 0.15)', name='Banda (±2 desvíos)'),
+        go.Scatter(x=tabla['PERIODO'][~tabla['PROYECTADO']], y=tabla['TENDENCIA'][~tabla['PROYECTADO']],
+                   mode='lines', line=dict(color='#ff4b4b'), name='Tendencia'),
+        go.Scatter(x=proyectado['PERIODO'], y=proyectado['TENDENCIA'], mode='lines+markers',
+                   line=dict(color='#ff4b4b', dash='dash'), name='Proyección'),
+        go.Scatter(x=tabla['PERIODO'], y=tabla['OBSERVADO'], mode='lines+markers',
+                   line=dict(color='#1f77b4'), name='Observado'),
+    ])
+    fig.update_layout(title=titulo, xaxis_title='Periodo', yaxis_title=etiqueta, hovermode='x unified')
+    return fig
+
+# Caché LRU de figuras, con límite de entradas y de bytes. Cada entrada guarda la figura
+# ya construida y su JSON (el mismo que arma st.plotly_chart), así en un acierto no se
+# vuelve a agregar ni a construir. Las figuras de la caché se comparten entre sesiones y no deben
+# modificarse. El límite de bytes cuenta el JSON de cada figura.
+# La clave es (id del gráfico, parámetros seleccionados, versión de los datos).
+class CacheFiguras:
+    def __init__(self, max_entradas=128, max_bytes=32 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    # Devuelve la figura de `clave`; si no está en caché la construye con `construir()`
+    def obtener(self, clave, construir):
+        return self.obtener_serializada(clave, construir)[0]
+
+    # Devuelve (figura, JSON) de `clave`
+    def obtener_serializada(self, clave, construir):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada
+            self.fallos += 1
+        figura = construir()
+        entrada = (figura, self.serializar(figura))
+        self.guardar(clave, *entrada)
+        return entrada
+
+    def guardar(self, clave, figura, figura_json=None):
+        if figura_json is None:
+            figura_json = self.serializar(figura)
+        tamano = len(figura_json)
+        # Una figura más grande que todo el presupuesto no se guarda
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior[1])
+            self._entradas[clave] = (figura, figura_json)
+            self._bytes += tamano
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                _clave, desalojada = self._entradas.popitem(last=False)
+                self._bytes -= len(desalojada[1])
+                self.desalojos += 1
+
+    def __contains__(self, clave):
+        with self._lock:
+            return clave in self._entradas
+
+    # El mismo JSON que arma st.plotly_chart (figura ya validada, sin uids de las trazas)
+    @staticmethod
+    def serializar(figura):
+        import plotly.io as pio
+        return pio.to_json(figura, validate=False)
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'tasa_aciertos': self.aciertos / total if total else 0.0,
+            }
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
@@ -0,0 +1,122 @@
+# Instrumentación del camino caliente: tramos de tiempo por rerun, con tamaños de payload.
+# Desactivada (lo normal), `tramo()` devuelve siempre el mismo objeto que no hace nada.
+import json
+import os
+import threading
+import time
+import uuid
+
+# Variables de entorno: RESIDUOS_DEBUG=1 activa la instrumentación para todas las sesiones
+# y RESIDUOS_TRAZAS_JSONL=<ruta> agrega una línea JSON por rerun a ese archivo
+ACTIVO_POR_ENTORNO = os.environ.get('RESIDUOS_DEBUG') == '1'
+RUTA_JSONL = os.environ.get('RESIDUOS_TRAZAS_JSONL')
+
+_lock_archivo = threading.Lock()
+
+
+# Estado por hilo: Streamlit ejecuta cada rerun de una sesión en su propio hilo
+class _Estado(threading.local):
+    activo = False
+    en_curso = False
+    tramos = None
+    profundidad = 0
+    inicio = 0.0
+    etiqueta = None
+
+_estado = _Estado()
+
+
+class _TramoNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def anotar(self, **datos):
+        pass
+
+_NULO = _TramoNulo()
+
+
+class _Tramo:
+    __slots__ = ('nombre', 'datos', 'inicio', 'profundidad')
+
+    def __init__(self, nombre, datos):
+        self.nombre = nombre
+        self.datos = datos
+
+    def __enter__(self):
+        self.profundidad = _estado.profundidad
+        _estado.profundidad += 1
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        fin = time.perf_counter()
+        _estado.profundidad -= 1
+        _estado.tramos.append({
+            'nombre': self.nombre,
+            'inicio_ms': (self.inicio - _estado.inicio) * 1000,
+            'ms': (fin - self.inicio) * 1000,
+            'profundidad': self.profundidad,
+            **self.datos,
+        })
+        return False
+
+    # Agregar datos al tramo en curso (filas, bytes del JSON de la figura, etc.)
+    def anotar(self, **datos):
+        self.datos.update(datos)
+
+
+# Mide un bloque:  with tramo('agregacion', grafico='chart3') as t: ...; t.anotar(filas=n)
+def tramo(nombre, **datos):
+    if not _estado.activo:
+        return _NULO
+    return _Tramo(nombre, datos)
+
+def activo():
+    return _estado.activo
+
+# Si hay un rerun iniciado y sin finalizar en este hilo (en el rerun de un fragmento el
+# script no corre desde arriba, así que no lo hay)
+def en_rerun():
+    return _estado.en_curso
+
+# Identificador corto para etiquetar las trazas de una sesión
+def nueva_etiqueta():
+    return uuid.uuid4().hex[:8]
+
+
+# Marca el inicio de un rerun; `etiqueta` identifica la sesión en la traza
+def iniciar_rerun(activar=False, etiqueta=None):
+    _estado.activo = activar or ACTIVO_POR_ENTORNO
+    _estado.en_curso = True
+    _estado.tramos = [] if _estado.activo else None
+    _estado.profundidad = 0
+    _estado.etiqueta = etiqueta
+    _estado.inicio = time.perf_counter()
+
+# Cierra el rerun y devuelve su traza (None si la instrumentación está desactivada).
+# Si hay ruta JSONL configurada, la traza se agrega al archivo.
+def finalizar_rerun(ruta_jsonl=None):
+    _estado.en_curso = False
+    if not _estado.activo:
+        return None
+    traza = {
+        'id': uuid.uuid4().hex[:12],
+        'fecha': time.time(),
+        'sesion': _estado.etiqueta,
+        'total_ms': (time.perf_counter() - _estado.inicio) * 1000,
+        'tramos': sorted(_estado.tramos, key=lambda t: t['inicio_ms']),
+    }
+    ruta_jsonl = ruta_jsonl or RUTA_JSONL
+    if ruta_jsonl:
+        linea = json.dumps(traza, default=str)
+        with _lock_archivo, open(ruta_jsonl, 'a', encoding='utf-8') as f:
+            f.write(linea + '\n')
+    _estado.activo = False
+    _estado.tramos = None
+    return traza
@@ -0,0 +1,105 @@
+# Precarga especulativa de figuras: mientras el usuario mira una pestaña, un grupo
+# pequeño de hilos construye las figuras de las otras y las deja en la caché de figuras.
+# Si cambia la versión de los datos se cancela todo lo pendiente.
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentacion
+
+logger = logging.getLogger(__name__)
+
+
+class Precargador:
+    def __init__(self, cache_figuras, max_trabajos=2, max_pendientes=8):
+        self.cache_figuras = cache_figuras
+        self.max_pendientes = max_pendientes
+        self._pool = ThreadPoolExecutor(max_workers=max_trabajos, thread_name_prefix='precarga')
+        # Reentrante: si el trabajo ya terminó, add_done_callback llama a _terminar en el acto
+        self._lock = threading.RLock()
+        self._version = None
+        self._pendientes = {}
+        # Figuras que dejó la precarga en la caché y que todavía nadie pidió
+        self._precargadas = set()
+        self.lanzadas = 0
+        self.usadas = 0
+        self.desperdiciadas = 0
+        self.canceladas = 0
+
+    # Programa la construcción de `tareas` ([(clave, construir), ...]) para `version`.
+    # Las claves ya en caché o en curso se saltan, y nunca hay más de `max_pendientes`.
+    def programar(self, version, tareas):
+        with self._lock:
+            if version != self._version:
+                self._cancelar_todo()
+                self._version = version
+            self._purgar()
+            for clave, construir in tareas:
+                if len(self._pendientes) >= self.max_pendientes:
+                    break
+                if clave in self._pendientes or clave in self.cache_figuras:
+                    continue
+                futuro = self._pool.submit(self._construir, version, clave, construir)
+                self._pendientes[clave] = futuro
+                self.lanzadas += 1
+                futuro.add_done_callback(lambda f, clave=clave: self._terminar(clave, f))
+
+    def _construir(self, version, clave, construir):
+        if version != self._version:
+            return
+        figura = construir()
+        figura_json = self.cache_figuras.serializar(figura)
+        with self._lock:
+            # Si los datos cambiaron mientras se construía, la figura ya no sirve
+            if version != self._version:
+                self.canceladas += 1
+                return
+            self.cache_figuras.guardar(clave, figura, figura_json)
+            self._precargadas.add(clave)
+
+    def _terminar(self, clave, futuro):
+        with self._lock:
+            if self._pendientes.get(clave) is futuro:
+                del self._pendientes[clave]
+        if not futuro.cancelled() and futuro.exception() is not None:
+            logger.warning("Falló la precarga de %s: %r", clave, futuro.exception())
+
+    # Llamar con el lock tomado
+    def _cancelar_todo(self):
+        for futuro in list(self._pendientes.values()):
+            if futuro.cancel():
+                self.canceladas += 1
+        self._pendientes.clear()
+        self.desperdiciadas += len(self._precargadas)
+        self._precargadas.clear()
+
+    # Las figuras precargadas que la caché ya desalojó sin que nadie las pidiera
+    def _purgar(self):
+        desalojadas = {clave for clave in self._precargadas if clave not in self.cache_figuras}
+        self.desperdiciadas += len(desalojadas)
+        self._precargadas -= desalojadas
+
+    # Antes de mostrar una figura: si se está precargando se espera a que termine
+    # (en vez de construirla dos veces) y se cuenta si la precarga sirvió
+    def usar(self, clave):
+        with self._lock:
+            futuro = self._pendientes.get(clave)
+        if futuro is not None and not futuro.cancelled():
+            with instrumentacion.tramo('espera_precarga'):
+                futuro.exception()
+        with self._lock:
+            if clave in self._precargadas:
+                self._precargadas.discard(clave)
+                self.usadas += 1
+
+    def estadisticas(self):
+        with self._lock:
+            self._purgar()
+            return {
+                'lanzadas': self.lanzadas,
+                'pendientes': len(self._pendientes),
+                'listas_sin_usar': len(self._precargadas),
+                'usadas': self.usadas,
+                'desperdiciadas': self.desperdiciadas,
+                'canceladas': self.canceladas,
+            }
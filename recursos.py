@@ -0,0 +1,199 @@
+# Recursos estáticos (banner, fotos del equipo y logos): una variante WebP por imagen,
+# redimensionada al ancho con que se muestra y con la huella del contenido en el nombre
+# (p. ej. meyli.3f9a1c2b7d.webp). Se generan una sola vez en static/recursos/ (solo se
+# regeneran si cambia la imagen de origen) y Streamlit las sirve como archivos estáticos
+# en app/static/recursos/ (server.enableStaticServing en .streamlit/config.toml).
+# El logo remoto se descarga en segundo plano a una copia local; mientras no haya copia
+# (o si el servidor no responde) se muestra logo.jpeg.
+# Si una variante no se puede generar o escribir (carpeta de solo lectura, disco lleno,
+# Pillow sin WebP) se usa la imagen de origen.
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import urllib.request
+
+from PIL import Image
+
+import datos
+
+RECURSOS_DIR = os.path.join(datos.BASE_DIR, 'static', 'recursos')
+# Copias locales de imágenes remotas (orígenes de sus variantes)
+REMOTOS_DIR = os.path.join(RECURSOS_DIR, 'remotos')
+URL_BASE = 'app/static/recursos'
+MANIFIESTO = 'manifiesto.json'
+CALIDAD_WEBP = 80
+# Imagen -> ancho máximo (px) con que se muestra; las más chicas no se agrandan
+IMAGENES = {
+    'basura.jpg': 1280,
+    'meyli.jpeg': 600,
+    'lory.jpeg': 600,
+    'maximiliana.jpeg': 600,
+    'mayerly.jpeg': 600,
+    'logo.jpeg': 320,
+}
+LOGO_REMOTO_URL = 'https://www.precayetanovirtual.pe/moodle/pluginfile.php/1/theme_mb2nl/loadinglogo/1692369360/logo-cayetano.png'
+LOGO_REMOTO = 'logo-cayetano.png'
+LOGO_RESPALDO = 'logo.jpeg'
+ANCHO_LOGO = IMAGENES[LOGO_RESPALDO]
+# La copia del logo remoto se renueva una vez por semana; tras un fallo se reintenta a los 10 minutos
+MAX_EDAD_LOGO_S = 7 * 24 * 3600
+REINTENTO_LOGO_S = 600
+TIMEOUT_LOGO_S = 5
+
+logger = logging.getLogger(__name__)
+
+# Variantes ya resueltas en este proceso: {origen: (huella, archivo)}; si la variante no
+# se pudo generar, `archivo` es la ruta del origen (no se reintenta hasta que cambie)
+_variantes = {}
+_lock = threading.Lock()
+_descarga = {'hilo': None, 'fallo': 0.0}
+
+
+def _huella(origen, ancho):
+    huella = datos.huella_archivo(origen, con_hash=False)
+    return {**huella, 'ancho': ancho, 'calidad': CALIDAD_WEBP}
+
+def leer_manifiesto(recursos_dir=None):
+    ruta_manifiesto = os.path.join(recursos_dir or RECURSOS_DIR, MANIFIESTO)
+    if not os.path.exists(ruta_manifiesto):
+        return {}
+    with open(ruta_manifiesto, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# WebP de `origen` con `ancho` como máximo; el nombre lleva la huella de los bytes
+# generados, así una URL siempre corresponde al mismo contenido
+def generar_variante(origen, ancho, recursos_dir=None):
+    recursos_dir = recursos_dir or RECURSOS_DIR
+    with Image.open(origen) as imagen:
+        imagen = imagen.convert('RGBA' if imagen.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        if imagen.width > ancho:
+            imagen = imagen.resize((ancho, round(imagen.height * ancho / imagen.width)), Image.LANCZOS)
+        contenido = io.BytesIO()
+        imagen.save(contenido, 'WEBP', quality=CALIDAD_WEBP, method=6)
+    contenido = contenido.getvalue()
+    raiz = os.path.splitext(os.path.basename(origen))[0]
+    archivo = f'{raiz}.{hashlib.sha1(contenido).hexdigest()[:10]}.webp'
+    ruta = os.path.join(recursos_dir, archivo)
+    if not os.path.exists(ruta):
+        os.makedirs(recursos_dir, exist_ok=True)
+        with open(ruta + '.tmp', 'wb') as f:
+            f.write(contenido)
+        os.replace(ruta + '.tmp', ruta)
+    return archivo
+
+# Nombre de la variante de `origen` (ruta de la imagen fuente). Por llamada cuesta un stat
+# del origen; la variante se genera solo si falta o si el origen cambió desde la última
+# vez (según el manifiesto), y la anterior se borra. Si no se puede generar, devuelve la
+# ruta (absoluta) del origen: ver es_variante.
+def variante(origen, ancho, recursos_dir=None):
+    recursos_dir = recursos_dir or RECURSOS_DIR
+    huella = _huella(origen, ancho)
+    clave = (recursos_dir, origen)
+    with _lock:
+        en_memoria = _variantes.get(clave)
+        if en_memoria is not None and en_memoria[0] == huella:
+            return en_memoria[1]
+        try:
+            archivo = _resolver_variante(origen, ancho, huella, recursos_dir)
+        except Exception as e:
+            logger.warning("No se pudo generar la variante de %s, se usa el original: %r", origen, e)
+            archivo = os.path.abspath(origen)
+        _variantes[clave] = (huella, archivo)
+        return archivo
+
+# Se llama con _lock tomado
+def _resolver_variante(origen, ancho, huella, recursos_dir):
+    manifiesto = leer_manifiesto(recursos_dir)
+    actual = manifiesto.get(os.path.basename(origen))
+    if actual is not None and actual['huella'] == huella and os.path.exists(os.path.join(recursos_dir, actual['archivo'])):
+        archivo = actual['archivo']
+    else:
+        archivo = generar_variante(origen, ancho, recursos_dir)
+        if actual is not None and actual['archivo'] != archivo:
+            try:
+                os.remove(os.path.join(recursos_dir, actual['archivo']))
+            except FileNotFoundError:
+                pass
+        manifiesto[os.path.basename(origen)] = {
+            'archivo': archivo,
+            'huella': huella,
+            'bytes_origen': os.path.getsize(origen),
+            'bytes': os.path.getsize(os.path.join(recursos_dir, archivo)),
+        }
+        datos._escribir_json(os.path.join(recursos_dir, MANIFIESTO), manifiesto)
+    return archivo
+
+
+# Variante de una imagen del proyecto (nombre de IMAGENES)
+def imagen(nombre):
+    return variante(os.path.join(datos.BASE_DIR, nombre), IMAGENES[nombre])
+
+# False si `archivo` es la imagen de origen (no se pudo generar la variante)
+def es_variante(archivo):
+    return not os.path.isabs(archivo)
+
+def url(archivo):
+    return f'{URL_BASE}/{archivo}'
+
+def ruta(archivo):
+    return os.path.join(RECURSOS_DIR, archivo)
+
+
+def _descargar_logo():
+    destino = os.path.join(REMOTOS_DIR, LOGO_REMOTO)
+    try:
+        with urllib.request.urlopen(LOGO_REMOTO_URL, timeout=TIMEOUT_LOGO_S) as respuesta:
+            contenido = respuesta.read()
+        # Que sea una imagen válida antes de reemplazar la copia
+        Image.open(io.BytesIO(contenido)).verify()
+        os.makedirs(REMOTOS_DIR, exist_ok=True)
+        with open(destino + '.tmp', 'wb') as f:
+            f.write(contenido)
+        os.replace(destino + '.tmp', destino)
+    except Exception as e:
+        logger.warning("No se pudo descargar el logo remoto: %r", e)
+        with _lock:
+            _descarga['fallo'] = time.time()
+
+# Variante del logo remoto: nunca espera a la red. Si la copia local falta o es vieja se
+# descarga en un hilo aparte, y mientras tanto se usa la copia anterior o logo.jpeg.
+def logo_remoto():
+    copia = os.path.join(REMOTOS_DIR, LOGO_REMOTO)
+    existe = os.path.exists(copia)
+    with _lock:
+        vieja = not existe or time.time() - os.path.getmtime(copia) > MAX_EDAD_LOGO_S
+        libre = _descarga['hilo'] is None or not _descarga['hilo'].is_alive()
+        if vieja and libre and time.time() - _descarga['fallo'] > REINTENTO_LOGO_S:
+            _descarga['hilo'] = threading.Thread(target=_descargar_logo, name='logo-remoto', daemon=True)
+            _descarga['hilo'].start()
+    if existe:
+        return variante(copia, ANCHO_LOGO)
+    return variante(os.path.join(datos.BASE_DIR, LOGO_RESPALDO), ANCHO_LOGO)
+
+
+# Uso:  python recursos.py [--limpiar]   genera todas las variantes y compara tamaños
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Genera las variantes WebP de las imágenes del proyecto")
+    parser.add_argument('--limpiar', action='store_true', help="Borra las variantes existentes antes de generar")
+    args = parser.parse_args()
+    if args.limpiar:
+        shutil.rmtree(RECURSOS_DIR, ignore_errors=True)
+    for nombre in IMAGENES:
+        imagen(nombre)
+    logo_remoto()
+    if _descarga['hilo'] is not None:
+        _descarga['hilo'].join()
+        logo_remoto()
+    total_origen = total = 0
+    for nombre, info in sorted(leer_manifiesto().items()):
+        total_origen += info['bytes_origen']
+        total += info['bytes']
+        print(f"{nombre:<20} {info['bytes_origen'] / 1024:8.1f} KB -> {info['bytes'] / 1024:7.1f} KB  {info['archivo']}")
+    print(f"{'total':<20} {total_origen / 1024:8.1f} KB -> {total / 1024:7.1f} KB")
@@ -0,0 +1,219 @@
+# Servicio HTTP/JSON de consultas sin navegador: las mismas filas y agregados que muestra
+# app.py, con exportaciones CSV/JSON enviadas por partes, gzip opcional y ETag según la
+# versión de los datos (una consulta repetida sin cambios responde 304 sin cuerpo).
+# Uso:  python servicio.py [--host 127.0.0.1] [--puerto 8502]
+#
+#   GET /version
+#   GET /agregados?por=PERIODO,DEPARTAMENTO&PERIODO=2019&medidas=QRESIDUOS_MUN&formato=csv
+#   GET /filas?DEPARTAMENTO=LIMA&PERIODO=2020,2021&columnas=UBIGEO,DISTRITO,QRESIDUOS_MUN
+#   GET /rankings?nivel=Distrito&indicador=PER_CAPITA&periodo=2021&k=10&orden=menores
+import argparse
+import hashlib
+import json
+import logging
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import agregados
+import almacen
+import datos
+
+# Filas por parte al exportar (cada parte se serializa y se envía por separado)
+FILAS_POR_PARTE = 5000
+FORMATOS = {'json': 'application/json; charset=utf-8', 'csv': 'text/csv; charset=utf-8'}
+# Máximo de unidades por ranking
+MAX_K = 500
+
+logger = logging.getLogger(__name__)
+
+_estado = {'version': None}
+_lock = threading.Lock()
+
+
+# Datos, cubo e indicadores de la versión vigente. Como en app.py, el almacén se
+# sincroniza con el CSV (un stat si no cambió) y todo se recalcula solo si cambia la versión.
+def datos_vigentes():
+    manifiesto = almacen.sincronizar_desde_csv()
+    version = datos.version_datos(datos.UBIGEOS_CSV) + almacen.version(manifiesto)
+    with _lock:
+        if _estado['version'] != version:
+            df = datos.solo_lectura(almacen.cargar(manifiesto=manifiesto))
+            cubo = agregados.construir_cubo(df)
+            _estado.update(version=version, df=df, cubo=cubo, indicadores=agregados.construir_indicadores(cubo))
+        return dict(_estado)
+
+
+# Parámetros de la consulta: listas separadas por comas; las dimensiones se toman como filtros
+def _lista(parametros, nombre):
+    valores = parametros.get(nombre)
+    if not valores:
+        return None
+    return [v.strip() for v in ','.join(valores).split(',') if v.strip()]
+
+def _filtros(parametros):
+    filtros = {}
+    for dimension in agregados.DIMENSIONES:
+        valores = _lista(parametros, dimension)
+        if valores:
+            filtros[dimension] = [int(v) for v in valores] if dimension == 'PERIODO' else valores
+    return filtros
+
+
+def consultar_agregados(estado, parametros):
+    por = _lista(parametros, 'por') or ['PERIODO']
+    medidas = _lista(parametros, 'medidas')
+    desconocidas = set(medidas or []) - set(agregados.MEDIDAS)
+    if desconocidas:
+        raise ValueError(f"Medidas desconocidas: {sorted(desconocidas)}. Deben ser de {agregados.MEDIDAS}.")
+    return agregados.consultar_cubo(estado['cubo'], por, _filtros(parametros), medidas)
+
+def consultar_filas(estado, parametros):
+    df = estado['df']
+    mascara = np.ones(len(df), dtype=bool)
+    for columna, valores in _filtros(parametros).items():
+        mascara &= df[columna].isin(valores).to_numpy()
+    columnas = _lista(parametros, 'columnas')
+    if columnas:
+        desconocidas = set(columnas) - set(df.columns)
+        if desconocidas:
+            raise ValueError(f"Columnas desconocidas: {sorted(desconocidas)}")
+        df = df[columnas]
+    return df if mascara.all() else df[mascara]
+
+def consultar_rankings(estado, parametros):
+    nivel = (_lista(parametros, 'nivel') or ['Distrito'])[0]
+    indicador = (_lista(parametros, 'indicador') or ['PER_CAPITA'])[0]
+    if nivel not in agregados.NIVELES_RANKING or indicador not in agregados.INDICADORES:
+        raise ValueError(f"nivel debe ser de {list(agregados.NIVELES_RANKING)} e indicador de {list(agregados.INDICADORES)}")
+    indicadores = estado['indicadores']
+    periodo = int((_lista(parametros, 'periodo') or [indicadores['periodos'][-1]])[0])
+    if periodo not in indicadores['periodos']:
+        raise ValueError(f"PERIODO {periodo} no disponible: {indicadores['periodos']}")
+    k = int((_lista(parametros, 'k') or [10])[0])
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k debe estar entre 1 y {MAX_K}")
+    mayores = (_lista(parametros, 'orden') or ['mayores'])[0] != 'menores'
+    return agregados.ranking(indicadores, nivel, indicador, periodo, k, mayores)
+
+CONSULTAS = {
+    '/agregados': consultar_agregados,
+    '/filas': consultar_filas,
+    '/rankings': consultar_rankings,
+}
+
+
+# Filas como en el CSV de origen: UBIGEO con sus 6 dígitos (010101), no como entero
+def _formato_exportacion(parte):
+    if 'UBIGEO' in parte.columns:
+        parte = parte.assign(UBIGEO=parte['UBIGEO'].astype(str).str.zfill(6))
+    return parte
+
+# Partes de texto de la exportación, de FILAS_POR_PARTE filas cada una
+def partes_exportacion(df, formato):
+    if formato == 'csv':
+        for inicio in range(0, max(len(df), 1), FILAS_POR_PARTE):
+            yield _formato_exportacion(df.iloc[inicio:inicio + FILAS_POR_PARTE]).to_csv(index=False, header=inicio == 0)
+        return
+    yield '['
+    for inicio in range(0, len(df), FILAS_POR_PARTE):
+        registros = _formato_exportacion(df.iloc[inicio:inicio + FILAS_POR_PARTE]).to_json(orient='records', force_ascii=False)[1:-1]
+        yield (',' if inicio else '') + registros
+    yield ']'
+
+
+class Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ResiduosServicio/1.0'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parametros = parse_qs(url.query)
+        try:
+            estado = datos_vigentes()
+            if url.path == '/version':
+                self._responder_json(200, {'version': estado['version'], 'filas': len(estado['df'])})
+                return
+            if url.path not in CONSULTAS:
+                self._responder_json(404, {'error': f"Ruta desconocida: {url.path}", 'rutas': ['/version', *CONSULTAS]})
+                return
+            formato = (_lista(parametros, 'formato') or ['json'])[0]
+            if formato not in FORMATOS:
+                raise ValueError(f"formato debe ser de {list(FORMATOS)}")
+            gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+            # La respuesta depende solo de la URL, de la versión de los datos y de la codificación
+            etag = '"' + hashlib.sha1(f"{estado['version']}|{self.path}".encode()).hexdigest()[:20] + ('-gz"' if gzip else '"')
+            if etag in [e.strip() for e in self.headers.get('If-None-Match', '').split(',')]:
+                self.send_response(304)
+                self._cabeceras_cache(etag)
+                self.end_headers()
+                return
+            resultado = CONSULTAS[url.path](estado, parametros)
+        except (ValueError, KeyError) as e:
+            self._responder_json(400, {'error': str(e)})
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', FORMATOS[formato])
+        self.send_header('Transfer-Encoding', 'chunked')
+        if gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self._cabeceras_cache(etag)
+        self.send_header('X-Total-Filas', str(len(resultado)))
+        self.end_headers()
+        self._enviar_partes(partes_exportacion(resultado, formato), gzip)
+
+    def _cabeceras_cache(self, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+
+    # Envía cada parte como un trozo HTTP (Transfer-Encoding: chunked), comprimida al vuelo
+    def _enviar_partes(self, partes, gzip):
+        compresor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+        for parte in partes:
+            trozo = parte.encode('utf-8')
+            if compresor is not None:
+                trozo = compresor.compress(trozo)
+            self._escribir_trozo(trozo)
+        if compresor is not None:
+            self._escribir_trozo(compresor.flush())
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _escribir_trozo(self, trozo):
+        if trozo:
+            self.wfile.write(f'{len(trozo):X}\r\n'.encode() + trozo + b'\r\n')
+
+    def _responder_json(self, codigo, contenido):
+        cuerpo = json.dumps(contenido, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', FORMATOS['json'])
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        logger.info("%s - %s", self.address_string(), formato % args)
+
+
+def crear_servidor(host='127.0.0.1', puerto=8502):
+    return ThreadingHTTPServer((host, puerto), Manejador)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON de consultas de residuos municipales")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8502)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    datos_vigentes()
+    servidor = crear_servidor(args.host, args.puerto)
+    print(f"Sirviendo en http://{args.host}:{args.puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
@@ -0,0 +1,95 @@
+# Tablas paginadas: orden, proyección de columnas y página se aplican en el servidor,
+# así al navegador solo viaja la página visible (no el DataFrame completo)
+import math
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+# Límites de las cachés compartidas de órdenes (posiciones ordenadas) y de páginas
+MAX_ORDENES = 32
+MAX_PAGINAS = 256
+TAMANOS_PAGINA = [10, 25, 50, 100]
+SIN_ORDEN = '(sin orden)'
+
+_ordenes = OrderedDict()
+_paginas = OrderedDict()
+_lock = threading.Lock()
+
+
+def _de_cache(cache, clave):
+    with _lock:
+        if clave in cache:
+            cache.move_to_end(clave)
+            return cache[clave]
+    return None
+
+def _a_cache(cache, clave, valor, maximo):
+    with _lock:
+        cache[clave] = valor
+        while len(cache) > maximo:
+            cache.popitem(last=False)
+
+
+# Posiciones de las filas ordenadas por `columna` (orden estable, nulos al final),
+# calculadas una vez por (clave de los datos, columna, sentido)
+def _posiciones_ordenadas(df, clave, columna, ascendente):
+    clave_orden = (clave, columna, ascendente)
+    posiciones = _de_cache(_ordenes, clave_orden)
+    if posiciones is None:
+        serie = df[columna].reset_index(drop=True)
+        posiciones = serie.sort_values(ascending=ascendente, kind='stable', na_position='last').index.to_numpy()
+        _a_cache(_ordenes, clave_orden, posiciones, MAX_ORDENES)
+    return posiciones
+
+
+# Devuelve (página, total de filas, total de páginas). `clave` identifica los datos de `df`
+# (versión del archivo y filtros aplicados): dos llamadas con la misma clave deben recibir
+# el mismo DataFrame, porque las páginas y los órdenes se cachean con ella.
+def paginar(df, clave, pagina=1, tamano=25, orden=None, ascendente=True, columnas=None):
+    total = len(df)
+    total_paginas = max(1, math.ceil(total / tamano))
+    pagina = min(max(int(pagina), 1), total_paginas)
+    columnas = tuple(columnas) if columnas else None
+    clave_pagina = (clave, pagina, tamano, orden, ascendente, columnas)
+    trozo = _de_cache(_paginas, clave_pagina)
+    if trozo is None:
+        inicio = (pagina - 1) * tamano
+        if orden:
+            trozo = df.iloc[_posiciones_ordenadas(df, clave, orden, ascendente)[inicio:inicio + tamano]]
+        else:
+            trozo = df.iloc[inicio:inicio + tamano]
+        if columnas:
+            trozo = trozo[list(columnas)]
+        _a_cache(_paginas, clave_pagina, trozo, MAX_PAGINAS)
+    return trozo, total, total_paginas
+
+
+# Muestra `df` como tabla paginada con controles de orden, columnas, tamaño y página.
+# Si la tabla cabe en una página se muestra tal cual, sin controles.
+def mostrar_tabla(df, clave, key, tamano=25):
+    if len(df) <= tamano:
+        st.dataframe(df)
+        return
+    todas = [str(c) for c in df.columns]
+    columnas = st.multiselect('Columnas', todas, default=todas, key=f'{key}_columnas')
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
+    with col1:
+        orden = st.selectbox('Ordenar por', [SIN_ORDEN] + todas, key=f'{key}_orden')
+    with col2:
+        sentido = st.radio('Sentido', ['Ascendente', 'Descendente'], horizontal=True, key=f'{key}_sentido')
+    with col3:
+        tamano = st.selectbox('Filas por página', TAMANOS_PAGINA,
+                              index=TAMANOS_PAGINA.index(tamano) if tamano in TAMANOS_PAGINA else 0,
+                              key=f'{key}_tamano')
+    total_paginas = max(1, math.ceil(len(df) / tamano))
+    with col4:
+        # La clave incluye el total de páginas: si cambia (otro filtro u otro tamaño) se vuelve a la página 1
+        pagina = st.number_input('Página', min_value=1, max_value=total_paginas, value=1, step=1,
+                                 key=f'{key}_pagina_{total_paginas}')
+    orden = None if orden == SIN_ORDEN else df.columns[todas.index(orden)]
+    columnas = [df.columns[todas.index(c)] for c in columnas] or None
+    trozo, total, total_paginas = paginar(df, clave, pagina, tamano, orden, sentido == 'Ascendente', columnas)
+    st.dataframe(trozo)
+    inicio = (pagina - 1) * tamano
+    st.caption(f"Filas {inicio + 1}–{min(inicio + tamano, total)} de {total} · página {pagina} de {total_paginas}")
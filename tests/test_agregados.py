@@ -0,0 +1,112 @@
+# Pruebas de agregados.py sobre los datos reales.  Uso:  python -m pytest
+import numpy as np
+import pandas as pd
+import pytest
+
+import agregados
+import datos
+
+
+@pytest.fixture(scope='module')
+def df():
+    return datos.leer_csv_residuos(datos.RESIDUOS_CSV)
+
+@pytest.fixture(scope='module')
+def cubo(df):
+    return agregados.construir_cubo(df)
+
+
+@pytest.mark.parametrize('por, filtros', [
+    (['PERIODO'], None),
+    (['DEPARTAMENTO'], {'PERIODO': 2019}),
+    (['PERIODO', 'REG_NAT'], {'DEPARTAMENTO': ['LIMA', 'CUSCO']}),
+    (['DEPARTAMENTO', 'PROVINCIA', 'DISTRITO'], {'PERIODO': [2014, 2021]}),
+])
+def test_consultar_cubo_igual_a_groupby(df, cubo, por, filtros):
+    filas = df
+    for columna, valor in (filtros or {}).items():
+        filas = filas[filas[columna].isin(valor if isinstance(valor, list) else [valor])]
+    esperado = filas.groupby(por, sort=True, observed=True)[agregados.MEDIDAS].sum().reset_index()
+    resultado = agregados.consultar_cubo(cubo, por, filtros)
+    pd.testing.assert_frame_equal(resultado, esperado, check_dtype=False, check_categorical=False)
+
+def test_consultar_cubo_sin_agrupar(df, cubo):
+    total = agregados.consultar_cubo(cubo, [], {'PERIODO': 2020}, ['QRESIDUOS_MUN'])
+    assert total['QRESIDUOS_MUN'].iloc[0] == pytest.approx(df.loc[df['PERIODO'] == 2020, 'QRESIDUOS_MUN'].sum())
+
+def test_consultar_cubo_dimension_desconocida(cubo):
+    with pytest.raises(ValueError):
+        agregados.consultar_cubo(cubo, ['UBIGEO'])
+
+
+@pytest.fixture(scope='module')
+def indicadores(cubo):
+    return agregados.construir_indicadores(cubo)
+
+# Referencia: todas las unidades con dato, ordenadas por completo
+def _ranking_orden_completo(indicadores, nivel, indicador, periodo, k, mayores):
+    datos_nivel = indicadores['niveles'][nivel]
+    columna = datos_nivel['matrices'][indicador][:, indicadores['periodos'].index(periodo)]
+    tabla = datos_nivel['unidades'].assign(**{indicador: columna}).dropna(subset=[indicador])
+    return tabla.sort_values(indicador, ascending=not mayores, kind='stable').head(k)
+
+@pytest.mark.parametrize('nivel, indicador, periodo, k, mayores', [
+    ('Distrito', 'PER_CAPITA', 2021, 10, True),
+    ('Distrito', 'CRECIMIENTO', 2019, 25, False),
+    ('Provincia', 'PARTE_DOM', 2014, 5, True),
+    ('Departamento', 'QRESIDUOS_MUN', 2020, 100, True),
+])
+def test_ranking_igual_a_orden_completo(indicadores, nivel, indicador, periodo, k, mayores):
+    resultado = agregados.ranking(indicadores, nivel, indicador, periodo, k, mayores)
+    esperado = _ranking_orden_completo(indicadores, nivel, indicador, periodo, k, mayores)
+    assert len(resultado) == len(esperado)
+    assert resultado['PUESTO'].tolist() == list(range(1, len(esperado) + 1))
+    np.testing.assert_array_equal(resultado[indicador].to_numpy(), esperado[indicador].to_numpy())
+    # Con empates el orden entre unidades iguales puede variar (y en el puesto k, cuál
+    # entra): se comparan los conjuntos de las unidades con valor distinto al último
+    claves = list(agregados.NIVELES_RANKING[nivel])
+    def unidades(tabla):
+        tabla = tabla[tabla[indicador] != tabla[indicador].iloc[-1]]
+        return set(tabla[claves].itertuples(index=False, name=None))
+    assert unidades(resultado) == unidades(esperado)
+
+def test_ranking_memorizado(indicadores):
+    primero = agregados.ranking(indicadores, 'Distrito', 'PER_CAPITA', 2021, 10)
+    assert agregados.ranking(indicadores, 'Distrito', 'PER_CAPITA', 2021, 10) is primero
+
+
+# Referencia: un np.polyfit por fila, solo con los periodos con dato
+def _ajuste_polyfit(fila, t):
+    con_dato = ~np.isnan(fila)
+    if con_dato.sum() < agregados.MIN_PERIODOS_AJUSTE:
+        return np.nan, np.nan, np.nan
+    pendiente, intercepto = np.polyfit(t[con_dato], fila[con_dato], 1)
+    residuos = fila[con_dato] - (intercepto + pendiente * t[con_dato])
+    return intercepto, pendiente, np.sqrt((residuos ** 2).sum() / (con_dato.sum() - 2))
+
+def test_ajuste_por_lotes_igual_a_polyfit():
+    azar = np.random.default_rng(0)
+    t = np.arange(8, dtype=float)
+    matriz = 100 + 5 * t + azar.normal(0, 3, size=(200, len(t)))
+    # Filas con periodos sin dato, y algunas con menos del mínimo para ajustar
+    matriz[azar.random(matriz.shape) < 0.2] = np.nan
+    matriz[:5, 2:] = np.nan
+    intercepto, pendiente, desvio, n = agregados.ajustar_tendencias(matriz, t)
+    esperado = np.array([_ajuste_polyfit(fila, t) for fila in matriz])
+    np.testing.assert_allclose(intercepto, esperado[:, 0], rtol=1e-9)
+    np.testing.assert_allclose(pendiente, esperado[:, 1], rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(desvio, esperado[:, 2], rtol=1e-9)
+    np.testing.assert_array_equal(n, (~np.isnan(matriz)).sum(axis=1))
+
+def test_proyecciones_de_los_datos_reales(indicadores):
+    proyecciones = agregados.construir_proyecciones(indicadores)
+    t = np.array(indicadores['periodos'], dtype=float) - indicadores['periodos'][0]
+    matriz = indicadores['niveles']['Departamento']['matrices']['QRESIDUOS_MUN']
+    ajuste = proyecciones['niveles']['Departamento']['ajustes']['QRESIDUOS_MUN']
+    for fila in range(len(matriz)):
+        intercepto, pendiente, _desvio = _ajuste_polyfit(matriz[fila], t)
+        assert ajuste['pendiente'][fila] == pytest.approx(pendiente, rel=1e-9)
+        assert ajuste['intercepto'][fila] == pytest.approx(intercepto, rel=1e-9)
+    assert proyecciones['futuros'] == [indicadores['periodos'][-1] + i for i in (1, 2, 3)]
+    serie = agregados.proyeccion(proyecciones, 'Departamento', ('LIMA',), 'QRESIDUOS_MUN')
+    assert len(serie) == len(indicadores['periodos']) + agregados.HORIZONTE_PROYECCION
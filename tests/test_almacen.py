@@ -0,0 +1,50 @@
+# Pruebas del almacén particionado.  Uso:  python -m pytest
+import almacen
+import datos
+
+
+# Copia de residuos_municipales.csv sin la primera fila de 2014 (todas las filas
+# siguientes cambian de posición)
+def _csv_sin_una_fila(tmp_path):
+    with open(datos.RESIDUOS_CSV, 'rb') as f:
+        lineas = f.readlines()
+    ruta = tmp_path / 'residuos_editado.csv'
+    ruta.write_bytes(b''.join(lineas[:1] + lineas[2:]))
+    return str(ruta)
+
+def _huellas(df):
+    return {int(p): almacen.huella_particion(d) for p, d in df.groupby('PERIODO')}
+
+
+def test_huella_solo_cambia_el_anio_editado(tmp_path):
+    antes = _huellas(datos.leer_csv_residuos(datos.RESIDUOS_CSV))
+    despues = _huellas(datos.leer_csv_residuos(_csv_sin_una_fila(tmp_path)))
+    assert [p for p in antes if antes[p] != despues[p]] == [2014]
+
+def test_agregar_reescribe_solo_el_anio_editado(tmp_path):
+    almacen_dir = str(tmp_path / 'almacen')
+    df = datos.leer_csv_residuos(datos.RESIDUOS_CSV)
+    assert almacen.agregar_particiones(df, almacen_dir) == sorted(df['PERIODO'].unique())
+    editado = datos.leer_csv_residuos(_csv_sin_una_fila(tmp_path))
+    assert almacen.agregar_particiones(editado, almacen_dir) == [2014]
+    assert len(almacen.cargar(almacen_dir=almacen_dir)) == len(df) - 1
+
+# Varias sesiones sincronizando un almacén vacío a la vez (como tras un despliegue)
+def test_sincronizar_concurrente(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    almacen_dir = str(tmp_path / 'almacen')
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        manifiestos = list(pool.map(lambda _: almacen.sincronizar_desde_csv(almacen_dir=almacen_dir), range(6)))
+    assert len({almacen.version(m) for m in manifiestos}) == 1
+    assert len(almacen.cargar(almacen_dir=almacen_dir)) == len(datos.leer_csv_residuos(datos.RESIDUOS_CSV))
+
+# Almacén que no se puede escribir (despliegue de solo lectura): se usa el CSV
+def test_almacen_sin_escritura_lee_el_csv():
+    almacen_dir = '/dev/null/almacen'
+    manifiesto = almacen.sincronizar_desde_csv(almacen_dir=almacen_dir)
+    assert manifiesto['particiones'] == {}
+    assert almacen.version(manifiesto) == datos.version_datos(datos.RESIDUOS_CSV)
+    df = almacen.cargar(almacen_dir=almacen_dir, manifiesto=manifiesto)
+    assert len(df) == len(datos.leer_csv_residuos(datos.RESIDUOS_CSV))
+    assert sorted(almacen.cargar([2014], almacen_dir, manifiesto)['PERIODO'].unique()) == [2014]
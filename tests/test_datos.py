@@ -0,0 +1,24 @@
+# Pruebas de datos.py.  Uso:  python -m pytest
+import pytest
+
+import datos
+
+
+# Vista superficial de la copia compartida, como la que recibe cada sesión en app.load_data
+def _compartido_y_vista():
+    compartido = datos.solo_lectura(datos.leer_csv_residuos(datos.RESIDUOS_CSV))
+    return compartido, compartido.copy(deep=False)
+
+def test_solo_lectura_escribir_en_los_arreglos_falla():
+    _compartido, vista = _compartido_y_vista()
+    with pytest.raises(ValueError):
+        vista['POB_TOTAL'].to_numpy()[0] = -1
+    with pytest.raises(ValueError):
+        vista['POB_TOTAL'].values[0] = -1
+
+def test_solo_lectura_loc_no_cambia_la_copia_compartida():
+    compartido, vista = _compartido_y_vista()
+    original = compartido['POB_TOTAL'].iloc[0]
+    vista.loc[vista.index[0], 'POB_TOTAL'] = -1
+    assert vista['POB_TOTAL'].iloc[0] == -1
+    assert compartido['POB_TOTAL'].iloc[0] == original
@@ -0,0 +1,86 @@
+# Pruebas del motor de filtros de prueba.py sobre data.csv.  Uso:  python -m pytest
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import datos
+import filtros
+
+
+@pytest.fixture(scope='module')
+def motor():
+    df = pd.read_csv(os.path.join(datos.BASE_DIR, 'data.csv'), encoding='latin1', sep=';')
+    return filtros.construir_motor(df)
+
+# Referencia: los mismos filtros aplicados uno tras otro con pandas, como antes del motor
+def _filtrar_con_pandas(df, rango, region, ubicacion):
+    df = df.iloc[rango[0]:rango[1] + 1]
+    if region is not None:
+        df = df[df[filtros.COLUMNA_REGION] == region]
+    if ubicacion is not None:
+        departamento, provincia, distrito = ubicacion.split(filtros.SEPARADOR_UBICACION)
+        df = df[(df['DEPARTAMENTO'] == departamento) & (df['PROVINCIA'] == provincia) & (df['DISTRITO'] == distrito)]
+    return df
+
+
+def test_aplicar_igual_a_pandas(motor):
+    df = motor['df']
+    region = motor['regiones'][0]
+    ubicacion = filtros.opciones(motor, (0, len(df)), region)['ubicaciones'][3]
+    for rango, region_filtro, ubicacion_filtro in [
+        ((0, len(df)), None, None),
+        ((100, 900), region, None),
+        ((0, len(df)), region, ubicacion),
+        ((50, 60), None, ubicacion),
+    ]:
+        resultado = filtros.aplicar(motor, filtros.mascara(motor, rango, region_filtro, ubicacion_filtro))
+        pd.testing.assert_frame_equal(resultado, _filtrar_con_pandas(df, rango, region_filtro, ubicacion_filtro))
+
+def test_opciones_presentes_en_el_filtro(motor):
+    df = motor['df']
+    rango = (200, 700)
+    region = motor['regiones'][1]
+    resultado = filtros.opciones(motor, rango, region)
+    # En orden de aparición en todo el archivo, solo las presentes en el filtro
+    def presentes(columna, filas):
+        en_filas = set(columna(filas))
+        return [v for v in pd.unique(columna(df)) if v in en_filas]
+
+    def region_de(tabla):
+        return tabla[filtros.COLUMNA_REGION].astype(str)
+
+    def ubicacion_de(tabla):
+        departamento, provincia, distrito = (tabla[c].astype(str) for c in filtros.COLUMNAS_UBICACION)
+        return departamento + filtros.SEPARADOR_UBICACION + provincia + filtros.SEPARADOR_UBICACION + distrito
+
+    filas = _filtrar_con_pandas(df, rango, None, None)
+    assert resultado['regiones'] == presentes(region_de, filas)
+    assert resultado['ubicaciones'] == presentes(ubicacion_de, filas[filas[filtros.COLUMNA_REGION] == region])
+    assert filtros.opciones(motor, rango, region) is resultado
+
+def test_histograma_igual_a_numpy(motor):
+    df = motor['df']
+    columna = df.select_dtypes('number').columns[-1]
+    frecuencias, bordes = filtros.histograma(motor, 'todo', df, columna, bins=20)
+    valores = df[columna].dropna().to_numpy(dtype=float)
+    esperado, esperados_bordes = np.histogram(valores, bins=20)
+    np.testing.assert_array_equal(frecuencias, esperado)
+    np.testing.assert_allclose(bordes, esperados_bordes)
+
+def test_resumenes_acotados(motor, monkeypatch):
+    monkeypatch.setattr(filtros, 'MAX_RESUMENES', 3)
+    df = motor['df']
+    for inicio in range(10):
+        filtros.resumen_estadistico(motor, ('rango', inicio), df.iloc[inicio:inicio + 50])
+    assert len(motor['resumenes']) == 3
+    assert ('describe', ('rango', 9)) in motor['resumenes']
+
+def test_conteos_igual_a_value_counts(motor):
+    df = motor['df']
+    filas = filtros.aplicar(motor, filtros.mascara(motor, (0, 500), motor['regiones'][0]))
+    resultado = filtros.conteos(motor, 'conteos', filas, filtros.COLUMNA_REGION)
+    pd.testing.assert_series_equal(resultado, filas[filtros.COLUMNA_REGION].value_counts())
+    # Misma clave de filtro: se devuelve el conteo memorizado, sin recalcular
+    assert filtros.conteos(motor, 'conteos', df, filtros.COLUMNA_REGION) is resultado
@@ -0,0 +1,46 @@
+# Pruebas de la caché de figuras.  Uso:  python -m pytest
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import graficos
+
+
+def _figura(n):
+    return go.Figure(go.Bar(x=list(range(n)), y=list(range(n))))
+
+
+def test_acierto_devuelve_la_misma_figura():
+    cache = graficos.CacheFiguras()
+    construcciones = []
+
+    def construir():
+        construcciones.append(1)
+        return _figura(3)
+
+    figura, figura_json = cache.obtener_serializada('k', construir)
+    assert cache.obtener_serializada('k', construir) == (figura, figura_json)
+    assert cache.obtener('k', construir) is figura
+    assert len(construcciones) == 1
+    assert cache.estadisticas()['aciertos'] == 2 and cache.estadisticas()['fallos'] == 1
+
+# El JSON es el mismo que arma st.plotly_chart para la figura
+def test_serializar_como_plotly_chart():
+    figura = _figura(5)
+    assert graficos.CacheFiguras.serializar(figura) == pio.to_json(figura.to_dict(), validate=False)
+
+def test_lru_por_entradas_y_bytes():
+    cache = graficos.CacheFiguras(max_entradas=3)
+    for i in range(5):
+        cache.obtener(i, lambda: _figura(3))
+    assert [i in cache for i in range(5)] == [False, False, True, True, True]
+    assert cache.estadisticas()['desalojos'] == 2
+
+    tamano = len(graficos.CacheFiguras.serializar(_figura(50)))
+    cache = graficos.CacheFiguras(max_bytes=2 * tamano)
+    for i in range(3):
+        cache.obtener(i, lambda: _figura(50))
+    assert [i in cache for i in range(3)] == [False, True, True]
+    assert cache.estadisticas()['bytes'] == 2 * tamano
+    # Una figura más grande que todo el presupuesto no se guarda
+    cache.obtener('grande', lambda: _figura(20000))
+    assert 'grande' not in cache and 1 in cache
@@ -0,0 +1,45 @@
+# Pruebas de la precarga de figuras en segundo plano.  Uso:  python -m pytest
+import threading
+
+import plotly.graph_objects as go
+
+import graficos
+import precarga
+
+
+def _figura(n):
+    return go.Figure(go.Bar(x=list(range(n)), y=list(range(n))))
+
+
+def test_precarga_deja_las_figuras_en_cache():
+    cache = graficos.CacheFiguras()
+    precargador = precarga.Precargador(cache, max_trabajos=2)
+    precargador.programar('v1', [(('a', 'v1'), lambda: _figura(3)), (('b', 'v1'), lambda: _figura(4))])
+    for clave in [('a', 'v1'), ('b', 'v1')]:
+        precargador.usar(clave)
+        assert clave in cache
+    estadisticas = precargador.estadisticas()
+    assert estadisticas['lanzadas'] == 2 and estadisticas['usadas'] == 2 and estadisticas['pendientes'] == 0
+    # Lo que ya está en caché no se vuelve a lanzar
+    precargador.programar('v1', [(('a', 'v1'), lambda: _figura(3))])
+    assert precargador.estadisticas()['lanzadas'] == 2
+
+def test_precarga_descarta_la_version_anterior():
+    cache = graficos.CacheFiguras()
+    precargador = precarga.Precargador(cache, max_trabajos=1)
+    empezo, seguir = threading.Event(), threading.Event()
+
+    def lenta():
+        empezo.set()
+        seguir.wait(5)
+        return _figura(3)
+
+    precargador.programar('v1', [(('lenta', 'v1'), lenta), (('otra', 'v1'), lambda: _figura(3))])
+    empezo.wait(5)
+    # Cambian los datos mientras se construye: lo pendiente se cancela y lo que termine se descarta
+    precargador.programar('v2', [])
+    seguir.set()
+    precargador.usar(('lenta', 'v1'))
+    precargador._pool.shutdown(wait=True)
+    assert ('lenta', 'v1') not in cache and ('otra', 'v1') not in cache
+    assert precargador.estadisticas()['canceladas'] == 2
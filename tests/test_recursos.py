@@ -0,0 +1,22 @@
+# Pruebas de recursos.py.  Uso:  python -m pytest
+import os
+
+import recursos
+import datos
+
+
+def test_variante_webp(tmp_path):
+    archivo = recursos.variante(os.path.join(datos.BASE_DIR, 'logo.jpeg'), 64, str(tmp_path))
+    assert recursos.es_variante(archivo)
+    assert archivo.endswith('.webp') and os.path.exists(os.path.join(tmp_path, archivo))
+
+# Carpeta de variantes sin permisos, disco lleno o Pillow sin WebP: se usa el original
+def test_variante_fallida_usa_el_original(tmp_path, monkeypatch):
+    def falla(*args, **kwargs):
+        raise OSError(30, 'Read-only file system')
+
+    monkeypatch.setattr(recursos, 'generar_variante', falla)
+    origen = os.path.join(datos.BASE_DIR, 'logo.jpeg')
+    archivo = recursos.variante(origen, 64, str(tmp_path))
+    assert not recursos.es_variante(archivo)
+    assert recursos.ruta(archivo) == origen
@@ -0,0 +1,82 @@
+# Pruebas del servicio HTTP (servidor real en un puerto libre).  Uso:  python -m pytest
+import gzip
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import datos
+import servicio
+
+
+@pytest.fixture(scope='module')
+def url_base():
+    servidor = servicio.crear_servidor(puerto=0)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield f'http://127.0.0.1:{servidor.server_address[1]}'
+    servidor.shutdown()
+    servidor.server_close()
+
+# (código, cabeceras, cuerpo) de un GET; los errores HTTP también se devuelven
+def _get(url, **cabeceras):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=cabeceras)) as respuesta:
+            return respuesta.status, respuesta.headers, respuesta.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_version(url_base):
+    codigo, _cabeceras, cuerpo = _get(url_base + '/version')
+    assert codigo == 200
+    assert json.loads(cuerpo)['filas'] == len(datos.leer_csv_residuos(datos.RESIDUOS_CSV))
+
+@pytest.mark.parametrize('ruta, codigo', [
+    ('/desconocida', 404),
+    ('/agregados?medidas=NO_EXISTE', 400),
+    ('/agregados?por=UBIGEO', 400),
+    ('/filas?columnas=NO_EXISTE', 400),
+    ('/filas?formato=xml', 400),
+    ('/rankings?k=-3', 400),
+    ('/rankings?k=0', 400),
+    (f'/rankings?k={servicio.MAX_K + 1}', 400),
+    ('/rankings?k=abc', 400),
+    ('/rankings?periodo=1990', 400),
+    ('/rankings?nivel=Pais', 400),
+    ('/rankings?k=3', 200),
+])
+def test_codigos(url_base, ruta, codigo):
+    assert _get(url_base + ruta)[0] == codigo
+
+def test_rankings_k(url_base):
+    codigo, cabeceras, cuerpo = _get(url_base + '/rankings?nivel=Distrito&k=7')
+    assert codigo == 200 and cabeceras['X-Total-Filas'] == '7'
+    assert [fila['PUESTO'] for fila in json.loads(cuerpo)] == list(range(1, 8))
+
+def test_etag_y_304(url_base):
+    url = url_base + '/agregados?por=DEPARTAMENTO&PERIODO=2019'
+    codigo, cabeceras, cuerpo = _get(url)
+    assert codigo == 200 and cuerpo
+    etag = cabeceras['ETag']
+    codigo, cabeceras, cuerpo = _get(url, **{'If-None-Match': etag})
+    assert codigo == 304 and cuerpo == b'' and cabeceras['ETag'] == etag
+    # Otra consulta u otra codificación tiene otro ETag
+    assert _get(url_base + '/agregados?por=DEPARTAMENTO&PERIODO=2020', **{'If-None-Match': etag})[0] == 200
+    codigo, cabeceras, _cuerpo = _get(url, **{'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+    assert codigo == 200 and cabeceras['ETag'] != etag
+
+def test_gzip_igual_al_original(url_base):
+    url = url_base + '/filas?DEPARTAMENTO=AMAZONAS&formato=csv'
+    _codigo, _cabeceras, plano = _get(url)
+    _codigo, cabeceras, comprimido = _get(url, **{'Accept-Encoding': 'gzip'})
+    assert cabeceras['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(comprimido) == plano
+
+# Exportación como en el CSV de origen: UBIGEO con 6 dígitos y decimales sin ruido de float32
+def test_exportacion_como_el_csv(url_base):
+    _codigo, _cabeceras, cuerpo = _get(url_base + '/filas?DEPARTAMENTO=AMAZONAS&PERIODO=2014&columnas=UBIGEO,GPC_DOM')
+    primera = json.loads(cuerpo)[0]
+    assert primera == {'UBIGEO': '010101', 'GPC_DOM': 0.48}
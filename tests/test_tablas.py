@@ -0,0 +1,38 @@
+# Pruebas de la paginación de tablas.  Uso:  python -m pytest
+import numpy as np
+import pandas as pd
+import pytest
+
+import tablas
+
+
+@pytest.fixture
+def df():
+    azar = np.random.default_rng(0)
+    valores = azar.integers(0, 20, 103).astype(float)
+    valores[[5, 50]] = np.nan
+    return pd.DataFrame({'A': valores, 'B': [f'fila {i}' for i in range(103)]}, index=range(1000, 1103))
+
+
+def test_paginas_cubren_la_tabla(df):
+    paginas = []
+    pagina, total, total_paginas = tablas.paginar(df, 'cubren', 1, 25)
+    assert (total, total_paginas) == (103, 5)
+    for numero in range(1, total_paginas + 1):
+        paginas.append(tablas.paginar(df, 'cubren', numero, 25)[0])
+    pd.testing.assert_frame_equal(pd.concat(paginas), df)
+    # Páginas fuera de rango se llevan a la primera o la última
+    pd.testing.assert_frame_equal(tablas.paginar(df, 'cubren', 99, 25)[0], paginas[-1])
+    pd.testing.assert_frame_equal(tablas.paginar(df, 'cubren', 0, 25)[0], paginas[0])
+
+@pytest.mark.parametrize('ascendente', [True, False])
+def test_orden_igual_a_sort_values(df, ascendente):
+    esperado = df.sort_values('A', ascending=ascendente, kind='stable', na_position='last')
+    paginas = [tablas.paginar(df, ('orden', ascendente), n, 10, orden='A', ascendente=ascendente)[0]
+               for n in range(1, 12)]
+    pd.testing.assert_frame_equal(pd.concat(paginas), esperado)
+
+def test_columnas_y_cache(df):
+    pagina = tablas.paginar(df, 'columnas', 2, 10, columnas=['B'])[0]
+    assert list(pagina.columns) == ['B'] and pagina['B'].iloc[0] == 'fila 10'
+    assert tablas.paginar(df, 'columnas', 2, 10, columnas=['B'])[0] is pagina